@@ -7,6 +7,67 @@ class Config(object):
     DEBUG = True
     TESTING = False
 
+    # Connection pool of the database engine
+    DATABASE_POOL_SIZE = 10
+    DATABASE_MAX_OVERFLOW = 20
+    DATABASE_POOL_TIMEOUT = 30
+
+    # PRAGMAs run on every SQLite connection (https://www.sqlite.org/pragma.html)
+    SQLITE_PRAGMAS = {
+        # Readers do not block the writer and the writer does not block readers
+        "journal_mode": "WAL",
+        # Safe with WAL (only the last commits can be lost on power failure) and much faster than FULL
+        "synchronous": "NORMAL",
+        # Wait up to 5 seconds for a lock instead of failing with "database is locked"
+        "busy_timeout": 5000,
+        # Pages cache of 64 MB (negative values are KiB) and read through memory mapping up to 256 MB
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "foreign_keys": "ON",
+    }
+
+    # The admin dashboard report is rendered in the background by DASHBOARD_REPORT_WORKERS processes (one per chart,
+    # so they are rendered in parallel) and stored in DASHBOARD_REPORTS_FOLDER (src/database/reports by default).
+    # It is rendered again every DASHBOARD_REFRESH_INTERVAL seconds (0: only on demand, from the dashboard or with
+    # flask dashboard-report)
+    DASHBOARD_REPORT_WORKERS = 4
+    DASHBOARD_REFRESH_INTERVAL = 300
+
+    # Seconds the JSON series of the admin dashboard (drawn by the browser) are reused between views
+    DASHBOARD_SERIES_CACHE_TTL = 60
+
+    # Seconds the pool of products of the homepage carousel, and the rendered carousel, are reused
+    CAROUSEL_POOL_TTL = 300
+    CAROUSEL_CACHE_TTL = 5
+
+    # Seconds the browsers can keep a product image before revalidating it (with its ETag)
+    IMAGE_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+    # Seconds the path of a product image is reused without a query, and number of products whose path is kept
+    IMAGE_PATH_CACHE_TTL = 300
+    IMAGE_PATH_CACHE_SIZE = 10_000
+
+    # Largest request body accepted (larger uploads are rejected with 413 while they are read), largest image, and
+    # number of background workers that process the uploaded images
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    MAX_IMAGE_SIZE = 10 * 1024 * 1024
+    IMAGE_UPLOAD_WORKERS = 2
+
+    # Products per page in the catalogue, and seconds its (optional) total count and its categories are cached
+    PRODUCTOS_PER_PAGE = 10
+    PRODUCT_COUNT_CACHE_TTL = 60
+
+    # bcrypt work factor of the password hashes. Each extra round doubles the cost of a login (see flask
+    # password-benchmark). Hashes made with another cost are upgraded when their user logs in
+    BCRYPT_ROUNDS = 12
+
+    # Seconds a logged-in user is served from the identity cache of the process (Flask-Login user_loader)
+    IDENTITY_CACHE_TTL = 60
+
+    # Products per page of the JSON API (?per_page= can ask for up to API_MAX_PER_PAGE)
+    API_PER_PAGE = 100
+    API_MAX_PER_PAGE = 1000
+
 
 class DevelopmentConfig(Config):
     """
@@ -29,6 +90,9 @@ class TestingConfig(Config):
 
     TESTING = True
 
+    # Cheapest cost, so the tests do not spend their time hashing
+    BCRYPT_ROUNDS = 4
+
 
 app_config = {
     "development": DevelopmentConfig,
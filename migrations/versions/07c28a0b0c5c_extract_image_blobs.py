@@ -0,0 +1,93 @@
+"""extract image blobs
+
+Revision ID: 07c28a0b0c5c
+Revises: bc9cc2194547
+Create Date: 2026-10-18 15:32:04.181522
+
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "07c28a0b0c5c"
+down_revision = "bc9cc2194547"
+branch_labels = None
+depends_on = None
+
+# UPLOAD_FOLDER of the app (src/static), resolved from here so it does not depend on the working directory
+UPLOAD_FOLDER = Path(__file__).resolve().parents[2] / "src" / "static"
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# The helpers of src/utils/image_store.py as they were when the blobs were extracted: a migration must keep working
+# when the app code changes
+GENERIC_PRODUCT_IMAGE = "images/generic-product.png"
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+
+
+def detect_image_extension(head):
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def store_image_bytes(data):
+    """
+    Save data in the image store (images/<sha256>.<extension>) and return its path relative to UPLOAD_FOLDER, or None
+    when it is not an image
+    """
+    extension = detect_image_extension(data[:1024])
+    if extension is None:
+        return None
+
+    digest = hashlib.sha256(data).hexdigest()
+    relative_path = Path("images") / f"{digest}.{extension}"
+    full_path = UPLOAD_FOLDER / relative_path
+    if not full_path.exists():
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = full_path.with_name(f".upload-{digest}")
+        temporary_path.write_bytes(data)
+        os.replace(temporary_path, full_path)
+    return relative_path
+
+
+def upgrade():
+    # Products added through /add_producto (or seeded with the generic image) kept the raw image bytes in the
+    # image column: move them to the image store and keep only the path
+    connection = op.get_bind()
+    query = "SELECT id, image FROM producto WHERE image IS NOT NULL"
+    if connection.dialect.name == "sqlite":
+        query += " AND typeof(image) = 'blob'"
+
+    paths = []
+    for producto_id, image in connection.execute(sa.text(query)).fetchall():
+        if isinstance(image, str):
+            continue
+        path = store_image_bytes(bytes(image))
+        path = path.as_posix() if path else GENERIC_PRODUCT_IMAGE
+        paths.append({"producto_id": producto_id, "image": path})
+
+    if paths:
+        connection.execute(sa.text("UPDATE producto SET image = :image WHERE id = :producto_id"), paths)
+        # The originals are served until their thumbnails exist
+        logger.info(f"{len(paths)} images extracted, run `flask thumbnails` to generate their thumbnails")
+
+
+def downgrade():
+    # The extracted images stay in the store as files, the paths are still valid for the previous revision
+    pass
@@ -0,0 +1,69 @@
+"""hash passwords
+
+Revision ID: 552387b3d251
+Revises: c31a8dbc0b74
+Create Date: 2026-10-18 15:27:58.766006
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from alembic import op
+import bcrypt
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+
+
+# revision identifiers, used by Alembic.
+revision = "552387b3d251"
+down_revision = "c31a8dbc0b74"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# The helpers of src/utils/passwords.py as they were when the passwords were hashed: a migration must keep working
+# when the app code changes
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def is_password_hash(value):
+    return isinstance(value, str) and value.startswith(("$2a$", "$2b$", "$2y$")) and len(value) == 60
+
+
+def upgrade():
+    # Passwords used to be stored in plain text: hash them with the configured cost (BCRYPT_ROUNDS).
+    # bcrypt is slow on purpose, so the hashes are computed in parallel in a pool of processes (one per CPU)
+    connection = op.get_bind()
+    rows = [
+        (usuario_id, password)
+        for usuario_id, password in connection.execute(sa.text("SELECT id, password FROM usuario"))
+        if not is_password_hash(password)
+    ]
+    if not rows:
+        return
+
+    rounds = DEFAULT_BCRYPT_ROUNDS
+    if has_app_context():
+        rounds = current_app.config.get("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS)
+    with ProcessPoolExecutor() as executor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start : start + BATCH_SIZE]
+            # bcrypt.hashpw itself is sent to the workers (a function of this module could not be found by them)
+            hashes = executor.map(
+                bcrypt.hashpw,
+                [password.encode("utf-8") for _, password in batch],
+                [bcrypt.gensalt(rounds=rounds) for _ in batch],
+                chunksize=16,
+            )
+            connection.execute(
+                sa.text("UPDATE usuario SET password = :password WHERE id = :usuario_id"),
+                [
+                    {"usuario_id": usuario_id, "password": password_hash.decode("ascii")}
+                    for (usuario_id, _), password_hash in zip(batch, hashes)
+                ],
+            )
+
+
+def downgrade():
+    # The hashes can not be turned back into the passwords
+    pass
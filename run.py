@@ -4,12 +4,14 @@ import os
 # Third-party imports
 # Local imports
 from src import create_app
-from src.utils.utils import build_sample_db
+from src.bootstrap import upgrade_database
 
 config_name = os.getenv("FLASK_CONFIG", "development")
 
 app = create_app(config_name)
 
 if __name__ == "__main__":
-    build_sample_db()
+    # Only applies the pending migrations (if any). The sample data is loaded on demand with: flask sample-db
+    with app.app_context():
+        upgrade_database()
     app.run(debug=True)
@@ -13,17 +13,15 @@ from flask_sqlalchemy import SQLAlchemy  # https://flask-sqlalchemy.palletsproje
 
 # Local imports
 from config import app_config
+from .engine import REPLICA_BIND, configure_engines, get_engine_options
 from .models import db, Venta
-from .utils.utils import build_sample_db
-
-# from src.utils.utils import build_sample_db
 
 # Load all environment variables from the .env file
 load_dotenv()
 
 # db = SQLAlchemy()
 
-ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "svg", "gif", "bmp"}
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "bmp", "webp"}
 CURRENT_DIR = os.path.abspath(os.path.dirname(__file__))
 UPLOAD_FOLDER = "src/static"
 
@@ -38,14 +36,10 @@ def create_app(config_name):
     """
 
     app = Flask(__name__, instance_relative_config=True)
-    db_folder_created = False
 
-    # Create a 'database' folder if it is not done yet
-    try:
-        os.makedirs(Path(CURRENT_DIR, "database"))
-        db_folder_created = True
-    except OSError:
-        pass
+    # Create a 'database' folder if it is not done yet. The schema is created by the migrations (flask db upgrade)
+    # and the sample data is only loaded on demand (flask sample-db), nothing is rebuilt when the app starts
+    os.makedirs(Path(CURRENT_DIR, "database"), exist_ok=True)
 
     db_dir = Path(CURRENT_DIR, "database")
 
@@ -59,12 +53,15 @@ def create_app(config_name):
         # Generate a good salt using secrets.SystemRandom().getrandbits(128)
         SECURITY_PASSWORD_SALT=os.getenv("SECURITY_PASSWORD_SALT", "ThIsIsAdEfAuLtKeYiNcAsEnOtFoUnDInThEdOtEnV"),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,  # avoid FSADeprecationWarning
-        SQLALCHEMY_DATABASE_URI=f"sqlite:///{Path(db_dir, 'suministros.db')}",
+        SQLALCHEMY_DATABASE_URI=os.getenv("DATABASE_URL", f"sqlite:///{Path(db_dir, 'suministros.db')}"),
+        # Optional read replica for the catalogue reads. E.g. DATABASE_REPLICA_URL=sqlite:////path/to/replica.db
+        SQLALCHEMY_BINDS={REPLICA_BIND: os.getenv("DATABASE_REPLICA_URL")} if os.getenv("DATABASE_REPLICA_URL") else {},
         UPLOAD_FOLDER=UPLOAD_FOLDER,
         # Have session and remember cookie be samesite (flask/flask_login)
         REMEMBER_COOKIE_SAMESITE="strict",
         SESSION_COOKIE_SAMESITE="strict",
     )
+    app.config.setdefault("DASHBOARD_REPORTS_FOLDER", str(Path(db_dir, "reports")))
     # https://python-babel.github.io/flask-babel/
     # It is used for internationalization and localization support in Flask applications
     babel = Babel(app)
@@ -74,11 +71,12 @@ def create_app(config_name):
     # It can also create links to serve Bootstrap from a CDN and works with no boilerplate code in your application.
     Bootstrap(app)
 
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = get_engine_options(app.config)
     db.init_app(app)
+    configure_engines(app, db)
 
-    if db_folder_created:
-        with app.app_context():
-            build_sample_db()
+    # Session listeners that hand the uploaded images to the background workers once their product is committed
+    from .utils import uploads  # noqa: F401
 
     # Some imports are being done here to avoid circular import issues
     from src.auth.views import login_manager
@@ -103,13 +101,25 @@ def create_app(config_name):
     admin.add_view(ProductoModelView(Producto, db.session))
     admin.add_view(VentaModelView(Venta, db.session))
 
-    migrate = Migrate(app, db)  # https://flask-migrate.readthedocs.io/en/latest/
+    # https://flask-migrate.readthedocs.io/en/latest/
+    # SQLite can not ALTER most of the table properties, so migrations are rendered in "batch" mode
+    migrate = Migrate(app, db, directory=Path(CURRENT_DIR).parent / "migrations", render_as_batch=True)
+
+    # Flask CLI commands
+    from .commands import register_commands
+
+    register_commands(app)
 
     # Admin Blueprint
     from .admin import admin as admin_bp  # rename to avoid circular import error
 
     app.register_blueprint(admin_bp, name="admin_bp")
 
+    # API Blueprint
+    from .api import api
+
+    app.register_blueprint(api)
+
     # Authorization Blueprint
     from .auth import auth
 
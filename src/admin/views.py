@@ -11,7 +11,9 @@ from werkzeug.utils import secure_filename
 from wtforms import fields, validators
 
 # Local imports
+from src.models import db
 from src.producto.forms import ProductoForm
+from src.utils.passwords import is_password_hash
 
 
 class BaseForm(FlaskForm):
@@ -43,10 +45,14 @@ class LoginAdminForm(BaseForm):
             self.email.errors.append("Usuario(a) inválido")
             return False
 
-        if field.data != usuario.password:
+        if not usuario.check_password(field.data):
             self.password.errors.append("Contrasenã inválida")
             return False
 
+        # Save the password hash if it was upgraded to the current cost
+        if db.session.is_modified(usuario):
+            db.session.commit()
+
         return True
 
     def get_user(self):
@@ -105,6 +111,11 @@ class UsuarioModelView(ModelView):
     # Column filters
     column_filters = ("nombre", "apellido", "username", "email", "fecha_de_registro")
 
+    def on_model_change(self, form, model, is_created):
+        # A password typed in the admin form is hashed, the hash shown in the form is kept as it is
+        if not is_password_hash(model.password):
+            model.set_password(model.password)
+
     def is_accessible(self):
         return login.current_user.is_authenticated and login.current_user.is_admin
 
@@ -149,7 +160,8 @@ class MyAdminIndexView(admin.AdminIndexView):
             return redirect(url_for(".index"))
 
         form = LoginAdminForm(request.form)
-        if helpers.validate_form_on_submit(form):
+        # validate_login is not a field validator (there is no "login" field), it has to be called explicitly
+        if helpers.validate_form_on_submit(form) and form.validate_login(form.password):
             usuario = form.get_user()
             if usuario is None:
                 flash("Correo electrónico o contraseña no válidos", "error")
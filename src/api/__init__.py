@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+# Versioned JSON API: breaking changes go to a new /api/v<N> blueprint
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+from . import views
@@ -0,0 +1,133 @@
+# Built-in imports
+# Thirty part imports
+from flask import current_app, jsonify, request
+
+# Local imports
+from src.engine import replica_reads
+from src.models import Producto, db
+from src.producto.pagination import paginate_keyset
+from . import api
+
+# Fields of a product that can be requested with ?fields=, in their default order
+PRODUCTO_FIELDS = {
+    "id": Producto.id,
+    "nombre": Producto.nombre,
+    "descripcion": Producto.descripcion,
+    "categoria": Producto.categoria,
+    "precio": Producto.precio,
+    "stock": Producto.stock,
+    "image": Producto.image,
+    "image_status": Producto.image_status,
+}
+# Largest number of products of a batch fetch (?ids=)
+MAX_IDS = 500
+
+
+class ApiError(ValueError):
+    """
+    Invalid request parameters, answered with 400 and a JSON error
+    """
+
+
+@api.errorhandler(ApiError)
+def handle_api_error(error):
+    return jsonify({"error": str(error)}), 400
+
+
+def get_fields():
+    """
+    Return the product fields requested with ?fields=id,precio,stock (all of them by default)
+    """
+    fields = request.args.get("fields")
+    if not fields:
+        return list(PRODUCTO_FIELDS)
+
+    fields = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in PRODUCTO_FIELDS]
+    if unknown or not fields:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(PRODUCTO_FIELDS)}")
+    return fields
+
+
+def get_ids():
+    """
+    Return the product ids requested with ?ids=1,2,3 (None when the parameter is not given)
+    """
+    ids = request.args.get("ids")
+    if ids is None:
+        return None
+
+    try:
+        ids = list(dict.fromkeys(int(producto_id) for producto_id in ids.split(",") if producto_id.strip()))
+    except ValueError:
+        raise ApiError("ids must be a comma separated list of integers")
+    if len(ids) > MAX_IDS:
+        raise ApiError(f"At most {MAX_IDS} ids can be requested at once")
+    return ids
+
+
+def query_productos(fields):
+    """
+    Query only the columns of the requested fields (plus the id, needed for the cursors and the batch fetch).
+    The result rows are plain tuples, no ORM instances are built
+    """
+    columns = [PRODUCTO_FIELDS[field] for field in fields]
+    if "id" not in fields:
+        columns.append(Producto.id)
+    return db.session.query(*columns)
+
+
+def serialize(rows, fields):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def conditional_json(payload):
+    """
+    JSON response with a strong ETag of its body. Clients sending it back in If-None-Match get an empty 304
+    """
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+@api.route("/productos")
+@replica_reads
+def list_productos():
+    """
+    Batch fetch (?ids=1,2,3) or cursor pagination (?cursor=&per_page=) of the catalogue, with sparse fieldsets
+    (?fields=id,precio,stock)
+    """
+    fields = get_fields()
+    ids = get_ids()
+
+    if ids is not None:
+        rows = query_productos(fields).filter(Producto.id.in_(ids)).all() if ids else []
+        found = {row.id for row in rows}
+        return conditional_json(
+            {
+                "data": serialize(rows, fields),
+                "missing": [producto_id for producto_id in ids if producto_id not in found],
+            }
+        )
+
+    per_page = request.args.get("per_page", current_app.config["API_PER_PAGE"], type=int)
+    per_page = max(1, min(per_page, current_app.config["API_MAX_PER_PAGE"]))
+    try:
+        page = paginate_keyset(query_productos(fields), (Producto.id,), request.args.get("cursor"), per_page)
+    except ValueError as error:
+        raise ApiError(str(error))
+
+    return conditional_json(
+        {"data": serialize(page.items, fields), "next_cursor": page.next_cursor, "prev_cursor": page.prev_cursor}
+    )
+
+
+@api.route("/productos/<int:producto_id>")
+@replica_reads
+def get_producto(producto_id):
+    fields = get_fields()
+    row = query_productos(fields).filter(Producto.id == producto_id).first()
+    if row is None:
+        return jsonify({"error": f"Producto {producto_id} not found"}), 404
+    return conditional_json({"data": serialize([row], fields)[0]})
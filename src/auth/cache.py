@@ -0,0 +1,128 @@
+# Built-in imports
+import threading
+import time
+from collections import namedtuple
+
+# Thirty part imports
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Local imports
+from ..models import Usuario, db
+
+SNAPSHOT_FIELDS = ("id", "nombre", "apellido", "username", "email", "is_admin")
+
+
+class UsuarioSnapshot(namedtuple("UsuarioSnapshot", SNAPSHOT_FIELDS)):
+    """
+    Immutable copy of the identity of a Usuario, returned by the Flask-Login user_loader as current_user.
+    It has the attributes the views and templates read (id, username, is_admin...), not the ORM relationships
+    """
+
+    __slots__ = ()
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def get_id(self):
+        return self.id
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+
+class IdentityCache:
+    """
+    Per-process cache of usuario_id -> UsuarioSnapshot, so authenticated requests do not query the user.
+    Entries expire after IDENTITY_CACHE_TTL seconds and are dropped when the usuario is written (see the listeners)
+    """
+
+    def __init__(self, default_ttl=60):
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return current_app.config.get("IDENTITY_CACHE_TTL", self.default_ttl)
+
+    def get(self, usuario_id):
+        """
+        Return the snapshot of the usuario, or None when it does not exist
+        """
+        cached = self._snapshots.get(usuario_id)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        columns = [getattr(Usuario, field) for field in SNAPSHOT_FIELDS]
+        row = db.session.query(*columns).filter(Usuario.id == usuario_id).first()
+        if row is None:
+            return None
+
+        snapshot = UsuarioSnapshot.from_row(row)
+        with self._lock:
+            self._snapshots[usuario_id] = (time.monotonic(), snapshot)
+        return snapshot
+
+    def invalidate(self, usuario_id=None):
+        with self._lock:
+            self.invalidations += 1
+            if usuario_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(usuario_id, None)
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._snapshots),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / requests, 4) if requests else None,
+            "invalidations": self.invalidations,
+            "ttl": self.ttl,
+        }
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changed_usuarios(session, flush_context):
+    for instance in session.new | session.dirty | session.deleted:
+        if isinstance(instance, Usuario):
+            session.info.setdefault("usuarios_changed", set()).add(instance.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_bulk_usuario_writes(orm_execute_state):
+    # Bulk UPDATE/DELETE statements do not go through the flush: drop every snapshot on commit
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, Usuario):
+        orm_execute_state.session.info.setdefault("usuarios_changed", set()).add(None)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_identities_after_commit(session):
+    # After the commit, so a concurrent request can not cache the row as it was before it
+    usuarios_changed = session.info.pop("usuarios_changed", set())
+    if None in usuarios_changed:
+        identity_cache.invalidate()
+        return
+    for usuario_id in usuarios_changed:
+        identity_cache.invalidate(usuario_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_changed_usuarios_after_rollback(session):
+    session.info.pop("usuarios_changed", None)
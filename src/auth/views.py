@@ -2,12 +2,13 @@
 # Third-Party imports
 import datetime
 
-from flask import flash, redirect, render_template, request, url_for, get_flashed_messages
-from flask_login import login_required, login_user, logout_user, LoginManager
+from flask import abort, flash, jsonify, redirect, render_template, request, url_for, get_flashed_messages
+from flask_login import current_user, login_required, login_user, logout_user, LoginManager
 from sqlalchemy.exc import SQLAlchemyError
 
 # Local imports
 from . import auth
+from .cache import identity_cache
 from .forms import LoginForm, SignUpForm
 from ..models import Usuario, db
 
@@ -69,7 +70,11 @@ def login():
         if form.validate_on_submit():
             # Check if the user exists in the DB and if the password entered matches the password in the DB
             usuario = Usuario.query.filter_by(email=form.email.data).first()
-            if usuario and (form.password.data == usuario.password):
+            if usuario and usuario.check_password(form.password.data):
+                # Save the password hash if it was upgraded to the current cost
+                if db.session.is_modified(usuario):
+                    db.session.commit()
+
                 # Log user in
                 login_user(usuario)
 
@@ -112,4 +117,17 @@ login_manager = LoginManager()
 # Set up user_loader
 @login_manager.user_loader
 def load_user(user_id):
-    return Usuario.query.get(int(user_id))
+    # An immutable snapshot of the user, served from the per-process identity cache
+    return identity_cache.get(int(user_id))
+
+
+@auth.route("/identity_cache")
+@login_required
+def identity_cache_stats():
+    """
+    Hit/miss counters of the identity cache of this process (admins only)
+    """
+
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(identity_cache.stats())
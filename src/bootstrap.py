@@ -0,0 +1,126 @@
+# Built-in imports
+import shutil
+from pathlib import Path
+
+# Thirty part imports
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask import current_app
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+
+# Local imports
+from .models import db
+
+# Revision of the schema that db.create_all() used to build before the migrations were versioned
+INITIAL_REVISION = "18d54fdeea06"
+TEMPLATE_FOLDER = "templates"
+
+
+def head_revision():
+    """
+    Latest revision of the migrations folder
+    """
+    config = current_app.extensions["migrate"].migrate.get_config()
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def database_revision():
+    """
+    Revision the database is at (None when it has no alembic_version table, e.g. empty or built with create_all)
+    """
+    with db.engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def upgrade_database():
+    """
+    Bring the database schema to the latest revision. It does nothing when it is already there, so it is safe to run
+    on every start. Databases built with db.create_all() (no alembic_version table) are adopted as the initial revision
+    """
+    revision = database_revision()
+    head = head_revision()
+    if revision == head:
+        return False
+
+    if revision is None and inspect(db.engine).has_table("producto"):
+        stamp(revision=INITIAL_REVISION)
+    upgrade(revision=head)
+    return True
+
+
+def sqlite_database_path(engine=None):
+    """
+    Path of the database file, or None when it is not a SQLite file (e.g. PostgreSQL or in memory)
+    """
+    url = (engine or db.engine).url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    return Path(url.database)
+
+
+def template_database_path():
+    """
+    Path of the pre-seeded sample database of the current schema. It is named after the head revision, so a new
+    migration invalidates it
+    """
+    database_path = sqlite_database_path()
+    if database_path is None:
+        return None
+    return database_path.parent / TEMPLATE_FOLDER / f"sample-{head_revision()}.db"
+
+
+def copy_template_database(destination, template=None):
+    """
+    Copy the pre-seeded template database to destination (e.g. the database of a test run).
+    Returns the destination, or None when there is no template yet (build it with flask sample-db)
+    """
+    template = Path(template or template_database_path())
+    if not template.is_file():
+        return None
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    for suffix in ("-wal", "-shm"):
+        Path(f"{destination}{suffix}").unlink(missing_ok=True)
+    shutil.copyfile(template, destination)
+    return destination
+
+
+def save_template_database():
+    """
+    Write a compact copy of the current (SQLite) database as the template of its schema revision
+    """
+    template = template_database_path()
+    if template is None:
+        return None
+
+    template.parent.mkdir(parents=True, exist_ok=True)
+    template.unlink(missing_ok=True)
+    with db.engine.connect() as connection:
+        # VACUUM INTO writes a consistent, defragmented copy even with the database in WAL mode
+        connection.exec_driver_sql("VACUUM INTO ?", (str(template),))
+    return template
+
+
+def load_sample_database(rebuild=False):
+    """
+    Replace the database with the sample data. It is copied from the template of the current schema when there is one,
+    otherwise it is built (and saved as template for the next time). Returns True when the template was used
+    """
+    # Local import, the sample data is only needed here
+    from .utils.utils import build_sample_db
+
+    database_path = sqlite_database_path()
+    template = template_database_path()
+    if not rebuild and database_path is not None and template.is_file():
+        db.session.remove()
+        db.engine.dispose()
+        copy_template_database(database_path, template)
+        return True
+
+    build_sample_db()
+    # create_all() builds the schema of the models, which is the one of the head revision
+    stamp(revision=head_revision())
+    save_template_database()
+    return False
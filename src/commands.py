@@ -0,0 +1,391 @@
+# Built-in imports
+import datetime
+import os
+import statistics
+import time
+from pathlib import Path
+
+# Third-party imports
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+# Local imports
+from src.models import Producto, db
+from src.utils.thumbnails import generate_thumbnails_in_pool
+
+
+@click.command("thumbnails")
+@click.option("--workers", type=int, default=None, help="Number of processes (default: one per CPU).")
+@click.option("--force", is_flag=True, help="Generate again the thumbnails that are already up to date.")
+@with_appcontext
+def thumbnails_command(workers, force):
+    """
+    Generate the thumbnails of every product image
+    """
+    upload_folder = Path(current_app.config["UPLOAD_FOLDER"])
+    images = [image for (image,) in db.session.query(Producto.image).distinct() if image and isinstance(image, str)]
+
+    generated = generate_thumbnails_in_pool((upload_folder / image for image in images), workers=workers, force=force)
+    click.echo(f"{generated} thumbnails generated for {len(images)} images.")
+
+
+@click.command("seed")
+@click.option("--users", type=int, default=0, help="Number of users to generate.")
+@click.option("--products", type=int, default=0, help="Number of products to generate.")
+@click.option("--sales", type=int, default=0, help="Number of sales to generate.")
+@click.option("--days", type=int, default=2 * 365, help="Dates are spread over the last DAYS days.")
+@click.option("--batch-size", type=int, default=50_000, help="Rows inserted per transaction.")
+@click.option("--decrement-stock", is_flag=True, help="Take the units of the generated sales out of stock.")
+@click.option("--random-seed", type=int, default=None, help="Seed to generate the same data again.")
+@with_appcontext
+def seed_command(users, products, sales, days, batch_size, decrement_stock, random_seed):
+    """
+    Bulk generate synthetic users, products and sales (e.g. flask seed --users 100000 --sales 5000000)
+    """
+    # NumPy is only needed here, it is not imported with the app
+    import numpy as np
+
+    from src.utils.synthetic_data import generate_products, generate_sales, generate_users
+
+    rng = np.random.default_rng(random_seed)
+    end_date = datetime.datetime.now()
+    start_date = end_date - datetime.timedelta(days=days)
+
+    for name, total, generate in (
+        ("users", users, lambda progress: generate_users(users, rng, start_date, end_date, batch_size, progress)),
+        ("products", products, lambda progress: generate_products(products, rng, batch_size, progress)),
+        (
+            "sales",
+            sales,
+            lambda progress: generate_sales(
+                sales, rng, start_date, end_date, batch_size, decrement_stock=decrement_stock, progress=progress
+            ),
+        ),
+    ):
+        if not total:
+            continue
+        started = time.perf_counter()
+        with click.progressbar(length=total, label=f"Generating {total} {name}") as bar:
+            last = [0]
+
+            def progress(inserted):
+                bar.update(inserted - last[0])
+                last[0] = inserted
+
+            generate(progress)
+        click.echo(f"{total} {name} generated in {time.perf_counter() - started:.1f}s.")
+
+
+@click.command("sample-db")
+@click.option("--rebuild", is_flag=True, help="Build the sample data again instead of copying the cached template.")
+@click.confirmation_option(prompt="The current database will be replaced by the sample data. Continue?")
+@with_appcontext
+def sample_db_command(rebuild):
+    """
+    Replace the database with the sample data (admin, users, products and sales)
+    """
+    from src.bootstrap import load_sample_database
+
+    started = time.perf_counter()
+    from_template = load_sample_database(rebuild=rebuild)
+    source = "copied from the template" if from_template else "built"
+    click.echo(f"Sample database {source} in {time.perf_counter() - started:.1f}s.")
+
+
+@click.command("bootstrap")
+@with_appcontext
+def bootstrap_command():
+    """
+    Apply the pending migrations, if any (safe to run on every deploy or start)
+    """
+    from src.bootstrap import database_revision, upgrade_database
+
+    if upgrade_database():
+        click.echo(f"Database upgraded to {database_revision()}.")
+    else:
+        click.echo(f"Database already at {database_revision()}.")
+
+
+@click.command("rebuild-rollups")
+@click.option("--days", type=int, default=None, help="Only rebuild the last DAYS days (default: all the history).")
+@with_appcontext
+def rebuild_rollups_command(days):
+    """
+    Recompute the daily sales rollups (venta_diaria, venta_diaria_producto) from the venta table
+    """
+    from src.rollups import rebuild_rollups
+
+    started = time.perf_counter()
+    start_day = datetime.date.today() - datetime.timedelta(days=days) if days is not None else None
+    rebuild_rollups(start_day)
+    db.session.commit()
+    click.echo(f"Rollups rebuilt in {time.perf_counter() - started:.1f}s.")
+
+
+@click.command("dashboard-report")
+@with_appcontext
+def dashboard_report_command():
+    """
+    Generate the admin dashboard report now (e.g. from cron, with DASHBOARD_REFRESH_INTERVAL = 0)
+    """
+    from src.home.views import dashboard_report
+
+    snapshot = dashboard_report.generate(current_app._get_current_object())
+    if snapshot is None:
+        raise click.ClickException(f"The report could not be generated: {dashboard_report.last_error}")
+    click.echo(f"Dashboard report generated in {snapshot.duration:.1f}s ({', '.join(snapshot.charts)}).")
+
+
+@click.command("password-benchmark")
+@click.option("--min-rounds", type=click.IntRange(4, 31), default=10, help="Lowest bcrypt cost to measure.")
+@click.option("--max-rounds", type=click.IntRange(4, 31), default=14, help="Highest bcrypt cost to measure.")
+@click.option("--duration", type=float, default=2.0, help="Seconds spent measuring each cost.")
+@with_appcontext
+def password_benchmark_command(min_rounds, max_rounds, duration):
+    """
+    Measure how many logins (password checks) per second a core can do at each bcrypt cost
+    """
+    from src.utils.passwords import hash_password, verify_password
+
+    cores = os.cpu_count() or 1
+    configured = current_app.config["BCRYPT_ROUNDS"]
+    click.echo(f"{'rounds':>6} {'ms/login':>9} {'logins/s/core':>14} {f'logins/s ({cores} cores)':>22}")
+    for rounds in range(min_rounds, max_rounds + 1):
+        password_hash = hash_password("benchmark-password", rounds)
+        checks = 0
+        started = time.perf_counter()
+        # At least one check, the highest costs take more than a second each
+        while checks == 0 or time.perf_counter() - started < duration:
+            verify_password("benchmark-password", password_hash)
+            checks += 1
+        per_second = checks / (time.perf_counter() - started)
+        marker = "  <- BCRYPT_ROUNDS" if rounds == configured else ""
+        click.echo(f"{rounds:>6} {1000 / per_second:>9.1f} {per_second:>14.1f} {per_second * cores:>22.1f}{marker}")
+
+
+# Queries of the sales benchmark: the range and user filters the venta indexes serve. {venta} is the table, with or
+# without NOT INDEXED (SQLite then scans it, like before the indexes)
+SALES_BENCHMARK_QUERIES = {
+    "daily revenue, one month": (
+        "SELECT date(fecha_de_venta), sum(importe) FROM {venta} "
+        "WHERE fecha_de_venta >= :start AND fecha_de_venta < :end GROUP BY date(fecha_de_venta)"
+    ),
+    "units per product, one week": (
+        "SELECT producto_id, sum(cantidad) FROM {venta} "
+        "WHERE fecha_de_venta >= :start_week AND fecha_de_venta < :end_week GROUP BY producto_id"
+    ),
+    "user dashboard": "SELECT producto_id, sum(cantidad) FROM {venta} WHERE usuario_id = :usuario_id GROUP BY producto_id",
+}
+
+
+@click.command("sales-benchmark")
+@click.option("--repeat", type=int, default=5, help="Runs of each query (the median is shown).")
+@with_appcontext
+def sales_benchmark_command(repeat):
+    """
+    Time the sales queries with and without the venta indexes (SQLite). For a 1M-row table:
+    flask seed --users 10000 --products 1000 --sales 1000000 && flask sales-benchmark
+    """
+    from sqlalchemy import text
+
+    from src.home.views import month_range, week_range
+    from src.models import Venta
+
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("The benchmark compares with NOT INDEXED, which is only available in SQLite.")
+
+    # The ranges of the most recent sale, so they are not empty whatever the dates of the generated data
+    last_sale = db.session.query(func.max(Venta.fecha_de_venta)).scalar()
+    if last_sale is None:
+        raise click.ClickException("There are no sales, generate them first (flask seed --sales 1000000).")
+    start, end = month_range(last_sale)
+    start_week, end_week = week_range(last_sale)
+    usuario_id = db.session.query(Venta.usuario_id).order_by(Venta.fecha_de_venta.desc()).limit(1).scalar()
+    params = dict(start=start, end=end, start_week=start_week, end_week=end_week, usuario_id=usuario_id)
+
+    click.echo(f"{db.session.query(Venta).count()} sales")
+    click.echo(f"{'query':<28} {'indexed ms':>11} {'full scan ms':>13}")
+    for name, query in SALES_BENCHMARK_QUERIES.items():
+        timings = []
+        for venta in ("venta", "venta NOT INDEXED"):
+            statement = text(query.format(venta=venta))
+            runs = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                db.session.execute(statement, params).all()
+                runs.append(time.perf_counter() - started)
+            timings.append(statistics.median(runs) * 1000)
+        click.echo(f"{name:<28} {timings[0]:>11.1f} {timings[1]:>13.1f}")
+
+
+def run_concurrency_benchmark(database_path, pragmas, engine_options, readers, writers, duration):
+    """
+    Run readers threads (sales aggregate of the last 30 days) and writers threads (one-unit orders: conditional stock
+    UPDATE + Venta INSERT) on the SQLite file for duration seconds. Return the {reads, writes, errors} done
+    """
+    import threading
+
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    from src.engine import set_sqlite_pragmas
+
+    engine = create_engine(f"sqlite:///{database_path}", **engine_options)
+    set_sqlite_pragmas(engine, pragmas)
+    with engine.connect() as connection:
+        producto_ids = [
+            producto_id
+            for (producto_id,) in connection.execute(text("SELECT id FROM producto WHERE stock > 0 LIMIT 100"))
+        ]
+        usuario_id = connection.execute(text("SELECT min(id) FROM usuario")).scalar()
+    if not producto_ids or usuario_id is None:
+        raise click.ClickException("The benchmark needs products in stock and users (flask sample-db or flask seed).")
+
+    read = text("SELECT producto_id, sum(cantidad) FROM venta WHERE fecha_de_venta >= :start GROUP BY producto_id")
+    decrement_stock = text("UPDATE producto SET stock = stock - 1 WHERE id = :producto_id AND stock >= 1")
+    insert_venta = text(
+        "INSERT INTO venta (producto_id, usuario_id, cantidad, fecha_de_venta, precio_unitario, importe) "
+        "VALUES (:producto_id, :usuario_id, 1, :fecha_de_venta, 1.0, 1.0)"
+    )
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def count(name):
+        with lock:
+            counts[name] += 1
+
+    def reader():
+        while time.perf_counter() < deadline:
+            try:
+                with engine.connect() as connection:
+                    start = datetime.datetime.now() - datetime.timedelta(days=30)
+                    connection.execute(read, {"start": start}).all()
+                count("reads")
+            except OperationalError:
+                count("errors")
+
+    def writer(number):
+        n = number
+        while time.perf_counter() < deadline:
+            producto_id = producto_ids[n % len(producto_ids)]
+            n += writers
+            try:
+                with engine.begin() as connection:
+                    if connection.execute(decrement_stock, {"producto_id": producto_id}).rowcount:
+                        connection.execute(
+                            insert_venta,
+                            {
+                                "producto_id": producto_id,
+                                "usuario_id": usuario_id,
+                                "fecha_de_venta": datetime.datetime.now(),
+                            },
+                        )
+                count("writes")
+            except OperationalError:
+                count("errors")
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return counts
+
+
+@click.command("engine-benchmark")
+@click.option("--readers", type=int, default=4, help="Threads reading (sales aggregates).")
+@click.option("--writers", type=int, default=4, help="Threads writing (one-unit orders).")
+@click.option("--duration", type=float, default=5.0, help="Seconds each configuration runs.")
+@with_appcontext
+def engine_benchmark_command(readers, writers, duration):
+    """
+    Compare the throughput of concurrent readers and writers on copies of the SQLite database: SQLite defaults
+    (rollback journal, default pool) against SQLITE_PRAGMAS and the configured pool
+    """
+    import sqlite3
+    import tempfile
+    from contextlib import closing
+
+    from src.bootstrap import sqlite_database_path
+    from src.engine import get_engine_options
+
+    database_path = sqlite_database_path()
+    if database_path is None:
+        raise click.ClickException("The benchmark compares SQLite settings, the database is not a SQLite file.")
+
+    configurations = {
+        "before": ({"journal_mode": "DELETE"}, {}),
+        "after": (current_app.config["SQLITE_PRAGMAS"], get_engine_options(current_app.config)),
+    }
+    click.echo(f"{readers} readers, {writers} writers, {duration:.0f}s per configuration")
+    click.echo(f"{'':<7} {'reads/s':>9} {'writes/s':>9} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as folder:
+        for name, (pragmas, engine_options) in configurations.items():
+            # Each configuration runs on a fresh copy (the backup API copies a consistent snapshot, even with WAL)
+            copy_path = Path(folder, f"{name}.db")
+            with closing(sqlite3.connect(database_path)) as source, closing(sqlite3.connect(copy_path)) as copy:
+                source.backup(copy)
+            counts = run_concurrency_benchmark(copy_path, pragmas, engine_options, readers, writers, duration)
+            click.echo(
+                f"{name:<7} {counts['reads'] / duration:>9.1f} {counts['writes'] / duration:>9.1f} {counts['errors']:>7}"
+            )
+
+
+@click.command("api-benchmark")
+@click.option("--products", type=int, default=1000, help="Number of products fetched by each strategy.")
+@click.option("--batch-size", type=int, default=100, help="Ids per ?ids= request.")
+@with_appcontext
+def api_benchmark_command(products, batch_size):
+    """
+    Measure how many products per second each way of fetching them serves, through the test client (no network):
+    one /get_producto/<id> per product against the batch, sparse and paginated requests of /api/v1/productos
+    """
+    from src.api.views import MAX_IDS
+
+    batch_size = max(1, min(batch_size, MAX_IDS))
+    ids = [producto_id for (producto_id,) in db.session.query(Producto.id).order_by(Producto.id).limit(products)]
+    if not ids:
+        raise click.ClickException("There are no products, generate them first (flask seed --products 10000).")
+
+    batches = [",".join(map(str, ids[start : start + batch_size])) for start in range(0, len(ids), batch_size)]
+    strategies = {
+        "/get_producto/<id>": [f"/get_producto/{producto_id}" for producto_id in ids],
+        f"?ids= ({batch_size} per request)": [f"/api/v1/productos?ids={batch}" for batch in batches],
+        "?ids=&fields=id,precio,stock": [f"/api/v1/productos?ids={batch}&fields=id,precio,stock" for batch in batches],
+        f"?per_page={len(ids)}": [f"/api/v1/productos?per_page={len(ids)}"],
+    }
+
+    client = current_app.test_client()
+    click.echo(f"{len(ids)} products")
+    click.echo(f"{'strategy':<30} {'requests':>9} {'seconds':>8} {'products/s':>11} {'bytes/product':>14}")
+    for name, urls in strategies.items():
+        size = 0
+        started = time.perf_counter()
+        for url in urls:
+            response = client.get(url)
+            if response.status_code != 200:
+                raise click.ClickException(f"{url} returned {response.status_code}")
+            size += len(response.data)
+        elapsed = time.perf_counter() - started
+        click.echo(f"{name:<30} {len(urls):>9} {elapsed:>8.2f} {len(ids) / elapsed:>11.0f} {size / len(ids):>14.0f}")
+
+
+def register_commands(app):
+    """
+    Add the project commands to the flask CLI
+    """
+    app.cli.add_command(api_benchmark_command)
+    app.cli.add_command(bootstrap_command)
+    app.cli.add_command(dashboard_report_command)
+    app.cli.add_command(engine_benchmark_command)
+    app.cli.add_command(password_benchmark_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(sales_benchmark_command)
+    app.cli.add_command(sample_db_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(thumbnails_command)
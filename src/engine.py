@@ -0,0 +1,112 @@
+# Built-in imports
+import functools
+import sqlite3
+
+# Thirty part imports
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Local imports
+
+# Bind key (SQLALCHEMY_BINDS) of the read replica engine
+REPLICA_BIND = "replica"
+
+
+def get_engine_options(config):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS (connection pool sizing) from the app configuration
+    """
+    engine_options = {}
+    if not is_sqlite_memory(config["SQLALCHEMY_DATABASE_URI"]):
+        # In-memory SQLite databases live in a single connection, they do not use a pool of connections
+        engine_options.update(
+            pool_size=config["DATABASE_POOL_SIZE"],
+            max_overflow=config["DATABASE_MAX_OVERFLOW"],
+            pool_timeout=config["DATABASE_POOL_TIMEOUT"],
+        )
+        if not config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+            # Connections to a database server are checked before being used, so a connection dropped by the server
+            # is not handed to a request. A SQLite file can not drop them: the check would only add a round-trip
+            engine_options["pool_pre_ping"] = True
+    engine_options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    return engine_options
+
+
+def is_sqlite_memory(database_uri):
+    return database_uri.startswith("sqlite") and (database_uri.rstrip("/") == "sqlite:" or ":memory:" in database_uri)
+
+
+def set_sqlite_pragmas(engine, pragmas):
+    """
+    Run the PRAGMAs on every new SQLite connection of engine (e.g. WAL journal, so writers do not block readers)
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
+
+def configure_engines(app, db):
+    """
+    Configure the SQLAlchemy engines of the app. Call it once db.init_app(app) has created them
+    """
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            pragmas = dict(app.config["SQLITE_PRAGMAS"])
+            if bind_key == REPLICA_BIND:
+                # Nothing can be written to the replica by mistake
+                pragmas["query_only"] = "ON"
+            set_sqlite_pragmas(engine, pragmas)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the SELECTs of the read-only views (see replica_reads) to the read replica, when one is
+    configured. As soon as the session writes, it sticks to the primary database for the rest of the request, so it
+    always reads its own writes
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.reads_from_replica() and getattr(clause, "is_select", False):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def reads_from_replica(self):
+        return (
+            has_app_context()
+            and g.get("use_replica", False)
+            and not self.info.get("wrote", False)
+            and REPLICA_BIND in self._db.engines
+        )
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def stick_to_primary_after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def stick_to_primary_after_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+def replica_reads(view):
+    """
+    Decorator for the views that only read: their queries are served by the read replica (if any)
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,86 @@
+# Built-in imports
+import random
+import threading
+import time
+
+# Thirty part imports
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Local imports
+from ..models import Producto, db
+
+
+class CarouselPool:
+    """
+    Precomputed pool with the ids of the products that can be shown in the homepage carousel (in stock and with an
+    image). Sampling from it is O(k), instead of the full scan and sort of ORDER BY RANDOM().
+    The pool is reloaded when a product is written or after CAROUSEL_POOL_TTL seconds (stock also changes on checkout)
+    """
+
+    def __init__(self, default_ttl=300):
+        self.default_ttl = default_ttl
+        self._ids = []
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return current_app.config.get("CAROUSEL_POOL_TTL", self.default_ttl)
+
+    def ids(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+            self.refresh()
+        return self._ids
+
+    def refresh(self):
+        ids = [
+            producto_id
+            for (producto_id,) in db.session.query(Producto.id).filter(
+                Producto.stock > 0, Producto.image.isnot(None), Producto.image != ""
+            )
+        ]
+        with self._lock:
+            self._ids = ids
+            self._loaded_at = time.monotonic()
+
+    def sample(self, k):
+        """
+        Return k random product ids of the pool (all of them, shuffled, if there are fewer)
+        """
+        ids = self.ids()
+        return random.sample(ids, min(k, len(ids)))
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+class FragmentCache:
+    """
+    Short-lived cache of rendered fragments (HTML, series of the dashboard): {name: (rendered at, fragment)}
+    """
+
+    def __init__(self):
+        self._fragments = {}
+
+    def get(self, name, ttl, render):
+        cached = self._fragments.get(name)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+        html = render()
+        self._fragments[name] = (time.monotonic(), html)
+        return html
+
+
+carousel_pool = CarouselPool()
+fragment_cache = FragmentCache()
+
+
+@event.listens_for(Session, "after_flush")
+def refresh_carousel_pool_on_flush(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(instance, Producto) for instance in changed):
+        carousel_pool.invalidate()
@@ -0,0 +1,92 @@
+# Built-in imports
+from io import BytesIO
+
+# Thirty part imports
+# The charts are drawn on their own Figure (object-oriented API) instead of the global state of pyplot: they can be
+# rendered in any thread or process, and a figure is freed like any other object once its PNG is saved
+from matplotlib.figure import Figure
+
+# Local imports
+
+
+# Function to identify top-selling products for the current month
+def identify_top_selling_products(top_selling_products):
+    """
+    Chart the [(nombre, importe), ...] returned by query_top_products_by_revenue
+    """
+    n = len(top_selling_products)
+    product_names = [product[0] for product in top_selling_products]
+    sales_amounts = [product[1] for product in top_selling_products]
+
+    figure = Figure(figsize=(10, 6))
+    axes = figure.subplots()
+    axes.bar(product_names, sales_amounts, color="purple")
+    axes.set_title(f"Top {n} Selling Products for the Current Month")
+    axes.set_xlabel("Product")
+    axes.set_ylabel("Total Sales Amount")
+    axes.tick_params(axis="x", labelrotation=45)
+
+    return chart_to_png(figure)
+
+
+def generate_user_chart(registration_dates):
+    figure = Figure(figsize=(8, 6))
+    axes = figure.subplots()
+    axes.hist(registration_dates, bins=20, color="blue", alpha=0.7)
+    axes.set_title("Distribución de Fechas de Registro de Usuarios")
+    axes.set_xlabel("Fecha de Registro")
+    axes.set_ylabel("Numero de usuarios")
+    axes.tick_params(axis="x", labelrotation=45)
+
+    return chart_to_png(figure)
+
+
+def generate_product_chart(product_sales):
+    """
+    Chart the [(nombre, unidades), ...] of the best-selling products returned by query_product_sales
+    """
+    top_n = len(product_sales)
+
+    # Extract product names and sales counts for plotting
+    top_product_names = [product[0] for product in product_sales]
+    top_product_sales = [product[1] for product in product_sales]
+
+    # Create a bar chart for the top N products
+    figure = Figure(figsize=(10, 6))
+    axes = figure.subplots()
+    axes.bar(top_product_names, top_product_sales, color="purple")
+    axes.set_title(f"Principales {top_n} productos por ventas")
+    axes.set_xlabel("Producto")
+    axes.set_ylabel("Número de ventas")
+    axes.tick_params(axis="x", labelrotation=45)
+
+    return chart_to_png(figure)
+
+
+def generate_monthly_sales_chart(daily_revenue):
+    """
+    Chart the [(dia, importe), ...] returned by query_daily_revenue
+    """
+    # Extract days and corresponding sales amounts
+    days = [dia.day for dia, _ in daily_revenue]
+    sales_amounts = [importe for _, importe in daily_revenue]
+
+    # Create a bar chart for the daily sales amount for the current month
+    figure = Figure(figsize=(10, 6))
+    axes = figure.subplots()
+    axes.bar(days, sales_amounts, color="orange")
+    axes.set_title("Ventas diarias del mes actual")
+    axes.set_xlabel("Día")
+    axes.set_ylabel("Cantidad de ventas")
+
+    return chart_to_png(figure)
+
+
+def chart_to_png(figure):
+    """
+    Save the figure as PNG and return its bytes
+    """
+    figure.tight_layout()
+    buffer = BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
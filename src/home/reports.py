@@ -0,0 +1,250 @@
+# Built-in imports
+import datetime
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+# Thirty part imports
+from flask import current_app
+from werkzeug.security import safe_join
+
+# Local imports
+from ..models import db
+
+# The reports are rendered off-request: a coordinator thread collects their data (with an app context) and hands it
+# to a pool of processes, which render the charts with matplotlib. The PNGs are stored on disk as a snapshot, so
+# every worker of the web server serves the last completed one. No broker is needed: the pools are local to the process
+
+# Snapshots kept on disk: the current one and the previous one, so a page rendered just before a refresh can still
+# load its charts
+KEPT_SNAPSHOTS = 2
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool(app):
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # The pool is created from a thread of a multi-threaded web server: a forked worker would inherit the locks
+            # held by the other threads (logging, the connection pool, ...) at that moment. forkserver (or spawn where
+            # it is not available, e.g. Windows) starts the workers from a clean process instead
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _render_pool = ProcessPoolExecutor(
+                max_workers=app.config["DASHBOARD_REPORT_WORKERS"],
+                mp_context=multiprocessing.get_context(start_method),
+                initializer=import_charts,
+            )
+        return _render_pool
+
+
+def reset_render_pool():
+    """
+    Drop the process pool (e.g. after one of its workers died), a new one is created by the next refresh
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+def import_charts():
+    """
+    Initializer of the processes of the pool: matplotlib is imported once per process when it starts, never in the web
+    server
+    """
+    importlib.import_module(".charts", __package__)
+
+
+def render_chart(function, args):
+    """
+    Job of the process pool: render one chart (function of charts.py) as PNG bytes
+    """
+    from . import charts
+
+    return getattr(charts, function)(*args)
+
+
+def render_charts(chart_specs, pool):
+    """
+    Render {chart type: (chart function, args)} as {chart type: PNG bytes}, one job per chart so they are rendered in
+    parallel: the report takes as long as its slowest chart (with a worker per chart)
+    """
+    futures = {
+        chart_type: pool.submit(render_chart, function, args) for chart_type, (function, args) in chart_specs.items()
+    }
+    return {chart_type: future.result() for chart_type, future in futures.items()}
+
+
+class ReportSnapshot(namedtuple("ReportSnapshot", ["stamp", "generated_at", "duration", "charts", "folder"])):
+    """
+    A completed report: its charts are PNG files in folder, generated_at is a UTC datetime
+    """
+
+    __slots__ = ()
+
+    @property
+    def age(self):
+        """
+        Seconds since the report was generated
+        """
+        return (datetime.datetime.now(datetime.timezone.utc) - self.generated_at).total_seconds()
+
+
+class BackgroundReport:
+    """
+    A set of charts rendered in the background and stored as snapshots in <DASHBOARD_REPORTS_FOLDER>/<name>.
+    collect() runs in an app context and returns {chart type: (name of the function of charts.py, args)}.
+    The report is refreshed on demand (refresh) and every DASHBOARD_REFRESH_INTERVAL seconds (start_scheduler)
+    """
+
+    def __init__(self, name, collect):
+        self.name = name
+        self.collect = collect
+        self.last_error = None
+        self._future = None
+        self._coordinator = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-report")
+        self._scheduler = None
+        self._lock = threading.Lock()
+
+    def folder(self, app=None):
+        app = app or current_app
+        return Path(app.config["DASHBOARD_REPORTS_FOLDER"], self.name)
+
+    def latest(self):
+        """
+        Return the last completed ReportSnapshot, or None when the report was never generated
+        """
+        folder = self.folder()
+        try:
+            with open(folder / "latest.json", encoding="utf-8") as file:
+                latest = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        return self.snapshot(folder, latest)
+
+    @staticmethod
+    def snapshot(folder, latest):
+        return ReportSnapshot(
+            stamp=latest["stamp"],
+            generated_at=datetime.datetime.fromisoformat(latest["generated_at"]),
+            duration=latest["duration"],
+            charts=latest["charts"],
+            folder=folder / latest["stamp"],
+        )
+
+    def chart_path(self, chart_type, stamp=None):
+        """
+        Path of a chart of the snapshot stamp (the latest one by default), or None when it is not stored
+        """
+        if stamp is None:
+            snapshot = self.latest()
+            if snapshot is None:
+                return None
+            stamp = snapshot.stamp
+        # stamp and chart_type come from the URL
+        path = safe_join(str(self.folder()), stamp, f"{chart_type}.png")
+        if path is None or not os.path.isfile(path):
+            return None
+        return Path(path)
+
+    @property
+    def refreshing(self):
+        return self._future is not None and not self._future.done()
+
+    def refresh(self):
+        """
+        Queue a refresh of the report and return its future. A refresh already queued or running is reused
+        """
+        with self._lock:
+            if not self.refreshing:
+                self._future = self._coordinator.submit(self.generate, current_app._get_current_object())
+            return self._future
+
+    def generate(self, app):
+        """
+        Collect the data of the report, render its charts in the process pool and store them as the latest snapshot.
+        Errors are logged and the previous snapshot is kept
+        """
+        with app.app_context():
+            started = time.perf_counter()
+            try:
+                chart_specs = self.collect()
+                pngs = render_charts(chart_specs, get_render_pool(app))
+            except Exception as error:
+                if isinstance(error, BrokenProcessPool):
+                    # A worker of the pool died (e.g. killed by the OS): the pool can not run more jobs
+                    reset_render_pool()
+                self.last_error = str(error)
+                app.logger.warning(f"Error generating the {self.name} report: {str(error)}")
+                return None
+            finally:
+                # Give the connection of the coordinator thread back to the pool
+                db.session.remove()
+
+            self.last_error = None
+            return self.save(app, pngs, time.perf_counter() - started)
+
+    def save(self, app, pngs, duration):
+        generated_at = datetime.datetime.now(datetime.timezone.utc)
+        stamp = generated_at.strftime("%Y%m%dT%H%M%S%fZ")
+        folder = self.folder(app)
+        snapshot_folder = folder / stamp
+        os.makedirs(snapshot_folder, exist_ok=True)
+        for chart_type, png in pngs.items():
+            (snapshot_folder / f"{chart_type}.png").write_bytes(png)
+
+        # latest.json is replaced atomically, readers see either the previous snapshot or the new one
+        latest = {
+            "stamp": stamp,
+            "generated_at": generated_at.isoformat(),
+            "duration": round(duration, 3),
+            "charts": sorted(pngs),
+        }
+        temporary = folder / f"latest.json.{os.getpid()}.tmp"
+        temporary.write_text(json.dumps(latest), encoding="utf-8")
+        os.replace(temporary, folder / "latest.json")
+
+        # The stamps sort by date: remove the oldest snapshots
+        snapshots = sorted(path for path in folder.iterdir() if path.is_dir())
+        for old_snapshot in snapshots[:-KEPT_SNAPSHOTS]:
+            shutil.rmtree(old_snapshot, ignore_errors=True)
+
+        return self.snapshot(folder, latest)
+
+    def start_scheduler(self):
+        """
+        Start (once per process) the thread that refreshes the report every DASHBOARD_REFRESH_INTERVAL seconds.
+        Every process of the web server runs one, but a snapshot refreshed by another process is not generated again
+        """
+        app = current_app._get_current_object()
+        interval = app.config["DASHBOARD_REFRESH_INTERVAL"]
+        with self._lock:
+            if not interval or self._scheduler is not None:
+                return
+            self._scheduler = threading.Thread(
+                target=self.run_scheduler, args=(app, interval), name=f"{self.name}-report-scheduler", daemon=True
+            )
+            self._scheduler.start()
+
+    def run_scheduler(self, app, interval):
+        while True:
+            with app.app_context():
+                snapshot = self.latest()
+                if snapshot is None or snapshot.age >= interval:
+                    self.refresh()
+                    wait = interval
+                else:
+                    # Refreshed by another process (or on demand): wait until it is interval seconds old
+                    wait = interval - snapshot.age
+            time.sleep(wait)
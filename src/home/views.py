@@ -1,33 +1,48 @@
 # Built-in imports
-import base64
-from collections import defaultdict
-from datetime import datetime, timedelta
-from io import BytesIO
+from datetime import date, datetime, timedelta
 
 # Thirty part imports
-import matplotlib
-
-matplotlib.use("agg")  # Using Non-GUI Backend
-import matplotlib.pyplot as plt
-import pandas as pd
-from flask import render_template, abort, url_for
+from flask import render_template, abort, url_for, current_app, jsonify, request, send_file
 from flask_login import login_required, current_user
-from sqlalchemy import func
+from sqlalchemy import Date, func
 from werkzeug.utils import redirect
 
 # Local imports
 from . import home
-from ..models import Producto, Usuario, Venta
+from .cache import carousel_pool, fragment_cache
+from .reports import BackgroundReport
+from ..engine import replica_reads
+from ..models import Producto, Usuario, Venta, VentaDiaria, VentaDiariaProducto, db
+
+
+# Number of products shown in the homepage carousel
+CAROUSEL_SIZE = 15
+
+# Number of best-selling products shown in the product chart of the admin dashboard
+PRODUCT_CHART_TOP_N = 10
 
 
 @home.route("/")
 @home.route("/index")
+@replica_reads
 def homepage():
     """
     Render the homepage templates on the '/' or '/index' route
     """
-    carousel_products = Producto.query.order_by(func.random()).limit(15).all()
-    return render_template("home/index.html", title="Home", carousel_products=carousel_products)
+    carousel = fragment_cache.get("carousel", current_app.config["CAROUSEL_CACHE_TTL"], render_carousel)
+    return render_template("home/index.html", title="Home", carousel=carousel)
+
+
+def render_carousel():
+    """
+    Render the carousel with CAROUSEL_SIZE random products sampled from the carousel pool
+    """
+    carousel_ids = carousel_pool.sample(CAROUSEL_SIZE)
+    productos = {
+        producto.id: producto for producto in Producto.query.filter(Producto.id.in_(carousel_ids), Producto.stock > 0)
+    }
+    carousel_products = [productos[producto_id] for producto_id in carousel_ids if producto_id in productos]
+    return render_template("home/carousel.html", carousel_products=carousel_products)
 
 
 @home.route("/admin/dashboard")
@@ -36,23 +51,116 @@ def admin_dashboard():
     if not current_user.is_admin:
         abort(403)
 
-    registration_dates = [parse_date(usuario.fecha_de_registro) for usuario in Usuario.query.all()]
-    sales_current_month = fetch_sales_data_current_month()
-    top_selling_products = identify_top_selling_products(sales_current_month)
+    # The charts are drawn by the browser from the series served by admin_dashboard_data
+    return render_template(
+        "home/admin_dashboard.html",
+        data_urls={series: url_for("home.admin_dashboard_data", series=series) for series in DASHBOARD_SERIES},
+    )
+
 
-    user_chart_image = generate_user_chart(registration_dates)
-    product_chart_image = generate_product_chart()
-    monthly_sales_chart_image = generate_monthly_sales_chart(sales_current_month)
+@home.route("/admin/dashboard/data/<series>.json")
+@login_required
+def admin_dashboard_data(series):
+    """
+    One pre-aggregated series of the admin dashboard: {"labels": [...], "values": [...]}
+    """
+    if not current_user.is_admin:
+        abort(403)
+
+    query_series = DASHBOARD_SERIES.get(series)
+    if query_series is None:
+        abort(404)
+
+    # The whole-history series scan the rollups of every product: they are shared by the views for a short while
+    labels, values = fragment_cache.get(
+        f"dashboard-{series}", current_app.config["DASHBOARD_SERIES_CACHE_TTL"], query_series
+    )
+    response = jsonify(labels=labels, values=values)
+    # The browser revalidates with the ETag, an unchanged series is an empty 304
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@home.route("/admin/dashboard/export")
+@login_required
+def admin_dashboard_export():
+    if not current_user.is_admin:
+        abort(403)
 
+    # PNG version of the charts (matplotlib), e.g. to download them or for browsers without JavaScript. The page never
+    # renders charts: it shows the last snapshot of the report, generated in the background
+    dashboard_report.start_scheduler()
+    snapshot = dashboard_report.latest()
+    if snapshot is None:
+        dashboard_report.refresh()
     return render_template(
-        "home/admin_dashboard.html",
-        user_chart_image=user_chart_image,
-        product_chart_image=product_chart_image,
-        monthly_sales_chart_image=monthly_sales_chart_image,
-        top_selling_products=top_selling_products,
+        "home/admin_dashboard_export.html",
+        snapshot=snapshot,
+        refreshing=dashboard_report.refreshing,
+        chart_urls=dashboard_chart_urls(snapshot),
     )
 
 
+def dashboard_chart_urls(snapshot):
+    if snapshot is None:
+        return {}
+    # The stamp of the snapshot is in the URLs, so the browsers can cache the charts
+    return {
+        chart_type: url_for("home.admin_dashboard_chart", chart_type=chart_type, v=snapshot.stamp)
+        for chart_type in snapshot.charts
+    }
+
+
+@home.route("/admin/dashboard/refresh", methods=["POST"])
+@login_required
+def refresh_admin_dashboard():
+    if not current_user.is_admin:
+        abort(403)
+
+    dashboard_report.refresh()
+    return redirect(url_for("home.admin_dashboard_export"))
+
+
+@home.route("/admin/dashboard/status")
+@login_required
+def admin_dashboard_status():
+    """
+    Freshness of the dashboard report, e.g. to poll until a refresh is done
+    """
+    if not current_user.is_admin:
+        abort(403)
+
+    snapshot = dashboard_report.latest()
+    return jsonify(
+        generated_at=snapshot.generated_at.isoformat() if snapshot else None,
+        age=round(snapshot.age) if snapshot else None,
+        duration=snapshot.duration if snapshot else None,
+        refreshing=dashboard_report.refreshing,
+        last_error=dashboard_report.last_error,
+        charts=dashboard_chart_urls(snapshot),
+    )
+
+
+@home.route("/admin/dashboard/charts/<chart_type>.png")
+@login_required
+def admin_dashboard_chart(chart_type):
+    if not current_user.is_admin:
+        abort(403)
+
+    # v is the stamp of the snapshot: a page rendered just before a refresh still gets the charts it links to
+    chart_path = dashboard_report.chart_path(chart_type, request.args.get("v"))
+    if chart_path is None:
+        abort(404)
+
+    # The files of a snapshot never change
+    response = send_file(chart_path, mimetype="image/png", max_age=current_app.config["DASHBOARD_REFRESH_INTERVAL"])
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
 @home.route("/usuarios/dashboard")
 @login_required
 def dashboard():
@@ -66,6 +174,8 @@ def parse_date(date_str):
     """
     Parse the date string into a datetime object
     """
+    if isinstance(date_str, datetime):
+        return date_str
     return datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S.%f")
 
 
@@ -79,15 +189,65 @@ def fetch_sales_data():
         return []
 
 
+# Date ranges are half-open, [start_date, end_date), so consecutive ranges never share a sale and the filters
+# can be served by the (fecha_de_venta, producto_id) index of the venta table
+
+
+def month_range(day=None):
+    """
+    Return the (start_date, end_date) of the calendar month of the given day (today by default)
+    """
+    day = day or datetime.now()
+    start_date = datetime(day.year, day.month, 1)
+    if day.month == 12:
+        end_date = datetime(day.year + 1, 1, 1)
+    else:
+        end_date = datetime(day.year, day.month + 1, 1)
+    return start_date, end_date
+
+
+def week_range(day=None):
+    """
+    Return the (start_date, end_date) of the week (Monday to Sunday) of the given day (today by default)
+    """
+    day = day or datetime.now()
+    start_date = datetime(day.year, day.month, day.day) - timedelta(days=day.weekday())
+    return start_date, start_date + timedelta(days=7)
+
+
+def current_month_range():
+    """
+    Return the (start_date, end_date) of the current month
+    """
+    return month_range()
+
+
+def sales_between(query, start_date, end_date):
+    """
+    Restrict a query on Venta to the sales done in [start_date, end_date)
+    """
+    return query.filter(Venta.fecha_de_venta >= start_date, Venta.fecha_de_venta < end_date)
+
+
+def fetch_sales_data_range(start_date, end_date):
+    """
+    Fetch sales data for an arbitrary date range
+    """
+    return sales_between(Venta.query, start_date, end_date).all()
+
+
 def fetch_sales_data_current_month():
     """
     Fetch sales data for the current month
     """
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    start_date = datetime(current_year, current_month, 1)
-    end_date = start_date + timedelta(days=30)  # Assuming each month has 30 days for simplicity
-    return Venta.query.filter(Venta.fecha_de_venta >= start_date, Venta.fecha_de_venta <= end_date).all()
+    return fetch_sales_data_range(*month_range())
+
+
+def fetch_sales_data_current_week():
+    """
+    Fetch sales data for the current week
+    """
+    return fetch_sales_data_range(*week_range())
 
 
 def calculate_daily_sales_current_month(sales_current_month):
@@ -103,117 +263,98 @@ def calculate_daily_sales_current_month(sales_current_month):
     return daily_sales
 
 
-# Function to identify top-selling products for the current month
-def identify_top_selling_products(sales_current_month, n=5):
-    sales_data = [(sale.producto.nombre, sale.producto.precio * sale.cantidad) for sale in sales_current_month]
-    sales_df = pd.DataFrame(sales_data, columns=["Product", "Sales Amount"])
-    top_selling_products = sales_df.groupby("Product")["Sales Amount"].sum().nlargest(n)
-
-    plt.figure(figsize=(10, 6))
-    top_selling_products.plot(kind="bar", color="purple")
-    plt.title(f"Top {n} Selling Products for the Current Month")
-    plt.xlabel("Product")
-    plt.ylabel("Total Sales Amount")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-
-    # Save the chart to a BytesIO object
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-
-    # Encode the image as base64 for embedding in HTML
-    chart_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-    plt.close()  # Close the plot to avoid memory leaks
-
-    return chart_image
+# Analytics queries: they read the daily rollups (venta_diaria, venta_diaria_producto), so their cost grows with the
+# number of days and products, not with the number of sales. Date ranges must start and end at midnight
 
 
-def generate_user_chart(registration_dates):
-    plt.figure(figsize=(8, 6))
-    plt.hist(registration_dates, bins=20, color="blue", alpha=0.7)
-    plt.title("Distribución de Fechas de Registro de Usuarios")
-    plt.xlabel("Fecha de Registro")
-    plt.ylabel("Numero de usuarios")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-
-    # Save the chart to a BytesIO object
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-
-    # Encode the image as base64 for embedding in HTML
-    chart_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
+def query_product_sales(limit=None):
+    """
+    Units sold per product, best sellers first: [(nombre, unidades), ...]
+    """
+    unidades = func.coalesce(func.sum(VentaDiariaProducto.unidades), 0).label("unidades")
+    query = (
+        db.session.query(Producto.nombre, unidades)
+        .outerjoin(VentaDiariaProducto, VentaDiariaProducto.producto_id == Producto.id)
+        .group_by(Producto.id, Producto.nombre)
+        .order_by(unidades.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    return [tuple(row) for row in query.all()]
 
-    plt.close()  # Close the plot to avoid memory leaks
 
-    return chart_image
+def query_top_products_by_revenue(start_date, end_date, n=5):
+    """
+    The n products with the highest revenue in [start_date, end_date): [(nombre, importe), ...]
+    """
+    importe = func.sum(VentaDiariaProducto.importe).label("importe")
+    query = (
+        db.session.query(Producto.nombre, importe)
+        .join(VentaDiariaProducto, VentaDiariaProducto.producto_id == Producto.id)
+        .filter(VentaDiariaProducto.dia >= start_date.date(), VentaDiariaProducto.dia < end_date.date())
+        .group_by(Producto.id, Producto.nombre)
+        .order_by(importe.desc())
+        .limit(n)
+    )
+    return [tuple(row) for row in query.all()]
 
 
-def generate_product_chart():
-    # Fetch sales data for each product
-    products = Producto.query.all()
-    product_sales = [(product.nombre, sum([venta.cantidad for venta in product.ventas])) for product in products]
+def query_daily_revenue(start_date, end_date):
+    """
+    Revenue per day in [start_date, end_date), in date order: [(dia, importe), ...]
+    """
+    query = (
+        db.session.query(VentaDiaria.dia, VentaDiaria.importe)
+        .filter(VentaDiaria.dia >= start_date.date(), VentaDiaria.dia < end_date.date())
+        .order_by(VentaDiaria.dia)
+    )
+    return [tuple(row) for row in query.all()]
 
-    # Sort products based on the number of sales
-    product_sales.sort(key=lambda x: x[1], reverse=True)
 
-    # Select the top 10 products to display
-    top_n = 10  # We can adjust this value based on how many top products we want to display
+def query_registrations_per_day():
+    """
+    New users per day, in date order: [(dia, usuarios), ...]
+    """
+    dia = func.date(Usuario.fecha_de_registro, type_=Date)
+    query = db.session.query(dia, func.count(Usuario.id)).filter(Usuario.fecha_de_registro.isnot(None))
+    return [tuple(row) for row in query.group_by(dia).order_by(dia).all()]
 
-    # Extract product names and sales counts for plotting
-    top_product_names = [product[0] for product in product_sales[:top_n]]
-    top_product_sales = [product[1] for product in product_sales[:top_n]]
 
-    # Create a bar chart for the top N products
-    plt.figure(figsize=(10, 6))
-    plt.bar(top_product_names, top_product_sales, color="purple")
-    plt.title(f"Principales {top_n} productos por ventas")
-    plt.xlabel("Producto")
-    plt.ylabel("Número de ventas")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+def series(rows, round_values=False):
+    """
+    Split [(label, value), ...] into the (labels, values) lists of a dashboard series
+    """
+    labels = [label.isoformat() if isinstance(label, date) else label for label, _ in rows]
+    values = [round(value, 2) if round_values else value for _, value in rows]
+    return labels, values
 
-    # Save the chart to a BytesIO object
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
 
-    # Encode the image as base64 for embedding in HTML
-    chart_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
+# Series of the admin dashboard (drawn by the browser): {name: function that returns its (labels, values)}
+DASHBOARD_SERIES = {
+    "usuarios": lambda: series(query_registrations_per_day()),
+    "productos": lambda: series(query_product_sales(limit=PRODUCT_CHART_TOP_N)),
+    "ventas_mes": lambda: series(query_daily_revenue(*current_month_range()), round_values=True),
+    "top_productos": lambda: series(query_top_products_by_revenue(*current_month_range()), round_values=True),
+}
 
-    return chart_image
 
+# The PNG export of the charts is rendered in the background (see reports.py): these functions only collect its data
 
-def generate_monthly_sales_chart(sales_current_month):
-    # Initialize a dictionary to store daily sales amounts
-    daily_sales_data = defaultdict(float)
 
-    # Iterate through the sales for the current month and aggregate sales by day
-    for sale in sales_current_month:
-        day = sale.fecha_de_venta.day
-        daily_sales_data[day] += sale.producto.precio * sale.cantidad
-
-    # Extract days and corresponding sales amounts
-    days = list(daily_sales_data.keys())
-    sales_amounts = list(daily_sales_data.values())
-
-    # Create a bar chart for the daily sales amount for the current month
-    plt.figure(figsize=(10, 6))
-    plt.bar(days, sales_amounts, color="orange")
-    plt.title("Ventas diarias del mes actual")
-    plt.xlabel("Día")
-    plt.ylabel("Cantidad de ventas")
-    plt.tight_layout()
-
-    # Save the chart to a BytesIO object
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-
-    # Encode the image as base64 for embedding in HTML
-    chart_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-    return chart_image
+def collect_dashboard_charts():
+    """
+    Data of the admin dashboard charts: {chart type: (function of charts.py that renders it, args)}
+    """
+    registration_dates = [parse_date(fecha) for (fecha,) in db.session.query(Usuario.fecha_de_registro).all()]
+    return {
+        "usuarios": ("generate_user_chart", (registration_dates,)),
+        "productos": ("generate_product_chart", (query_product_sales(limit=PRODUCT_CHART_TOP_N),)),
+        "ventas_mes": ("generate_monthly_sales_chart", (query_daily_revenue(*current_month_range()),)),
+        "top_productos": (
+            "identify_top_selling_products",
+            (query_top_products_by_revenue(*current_month_range()),),
+        ),
+    }
+
+
+dashboard_report = BackgroundReport("dashboard", collect_dashboard_charts)
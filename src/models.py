@@ -1,18 +1,25 @@
 # Built-in imports
 from datetime import datetime
-from pathlib import Path
 
 # Thirty part imports
 from flask import current_app
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Float, Table, DateTime
-from sqlalchemy.orm import relationship
-from werkzeug.utils import secure_filename
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Float, Table, Date, DateTime, Index
+from sqlalchemy.orm import attribute_keyed_dict, relationship
 
 # Local imports
+from src.engine import RoutingSession
+from src.utils.image_store import spool_image
+from src.utils.passwords import hash_password, is_password_hash, needs_rehash, verify_password
 
-db = SQLAlchemy()
+# The session routes the reads of the read-only views to the read replica (if configured)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Values of Producto.image_status
+IMAGE_READY = "ready"
+IMAGE_PENDING = "pending"
+IMAGE_FAILED = "failed"
 
 # User-Product association table
 usuario_producto = Table(
@@ -36,6 +43,8 @@ class Producto(db.Model):
     precio = Column(Float(), index=True, nullable=False)
     stock = Column(Integer(), unique=False, nullable=False)
     image = Column(String(255))
+    # IMAGE_PENDING while an uploaded image is being processed, IMAGE_FAILED if it could not be
+    image_status = Column(String(10), nullable=False, default=IMAGE_READY, server_default=IMAGE_READY)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Establishing the relationship between Usuario and Producto and Ventas
@@ -43,11 +52,18 @@ class Producto(db.Model):
     ventas = relationship("Venta", back_populates="producto")
 
     def save_images(self, image_file):
-        filename = secure_filename(image_file.filename)
-        file_path = Path("images") / filename
-        file_full_path = current_app.config["UPLOAD_FOLDER"] / file_path
-        image_file.save(str(file_full_path))
-        self.image = str(file_path)
+        """
+        Stream the uploaded image to a temporary file and leave the product with image_status "pending".
+        Once the product is committed, a background worker verifies the image, generates its thumbnails and moves it
+        to the content-addressed image store (see src.utils.uploads). Raise InvalidImageError for non-images
+        """
+        self.pending_image = spool_image(
+            image_file.stream, current_app.config["UPLOAD_FOLDER"], current_app.config["MAX_IMAGE_SIZE"]
+        )
+        self.image_status = IMAGE_PENDING
+
+    # Image spooled by save_images, not saved yet (it is not a column)
+    pending_image = None
 
     def __init__(self, nombre, descripcion, categoria, precio, stock, image):
         self.nombre = nombre
@@ -88,6 +104,7 @@ class Usuario(UserMixin, db.Model):
     username = Column(String(50), index=True, unique=True, nullable=False)
     email = Column(String(80), index=True, unique=True, nullable=False)
     fecha_de_registro = Column(DateTime)
+    # bcrypt hash of the password (see set_password), never the password itself
     password = Column(String(), nullable=False)
     is_admin = Column(Boolean, default=False)
 
@@ -110,17 +127,42 @@ class Usuario(UserMixin, db.Model):
     def get_id(self):
         return self.id
 
+    def set_password(self, password):
+        self.password = hash_password(password)
+
+    def check_password(self, password):
+        """
+        Check the password of a login. When it matches but the hash was made with another cost (BCRYPT_ROUNDS
+        changed), the password is hashed again with the current one: the caller only needs to commit
+        """
+        if not verify_password(password, self.password):
+            return False
+        if needs_rehash(self.password):
+            self.set_password(password)
+        return True
+
     # Required for administrative interface
     def __unicode__(self):
         return self.username
 
-    def __init__(self, nombre, apellido, email, fecha_de_registro, username, password, is_admin=False):
+    def __init__(
+        self, nombre, apellido, email, fecha_de_registro, username, password=None, is_admin=False, password_hash=None
+    ):
+        """
+        password is always hashed, whatever it looks like. password_hash stores a hash made beforehand (e.g. one
+        hash shared by the sample users) as it is
+        """
+        if (password is None) == (password_hash is None):
+            raise ValueError("Give either password or password_hash")
+        if password_hash is not None and not is_password_hash(password_hash):
+            raise ValueError("password_hash is not a bcrypt hash")
+
         self.nombre = nombre
         self.apellido = apellido
         self.email = email
         self.fecha_de_registro = fecha_de_registro if fecha_de_registro else datetime.now()
         self.username = username
-        self.password = password
+        self.password = password_hash if password_hash is not None else hash_password(password)
         self.is_admin = is_admin
 
     def __repr__(self):
@@ -136,23 +178,139 @@ class Venta(db.Model):
     """
 
     __tablename__ = "venta"
+    __table_args__ = (
+        # Sales by date range (dashboards), grouped by product
+        Index("ix_venta_fecha_de_venta_producto_id", "fecha_de_venta", "producto_id"),
+        # Sales of a user (user dashboard), grouped by product
+        Index("ix_venta_usuario_id_producto_id", "usuario_id", "producto_id"),
+    )
+
     id = Column(Integer, primary_key=True)
-    producto_id = Column(Integer, ForeignKey("producto.id"), nullable=False)
+    producto_id = Column(Integer, ForeignKey("producto.id"), index=True, nullable=False)
     usuario_id = Column(Integer, ForeignKey("usuario.id"), nullable=False)
     cantidad = Column(Integer, nullable=False)
     fecha_de_venta = Column(DateTime, nullable=False)
+    # Price of the product when it was sold, and precio_unitario * cantidad: revenue never depends on the current
+    # price of the product (nor needs a join to it). Filled from the product when not given (see src/rollups.py)
+    precio_unitario = Column(Float(), nullable=False)
+    importe = Column(Float(), nullable=False)
 
     # Establishing the one-to-many relationship with Producto
     producto = relationship("Producto", back_populates="ventas")
 
-    def __init__(self, producto_id, usuario_id, cantidad, fecha_de_venta):
+    def __init__(self, producto_id, usuario_id, cantidad, fecha_de_venta, precio_unitario=None):
         self.producto_id = producto_id
         self.usuario_id = usuario_id
         self.cantidad = cantidad
         self.fecha_de_venta = fecha_de_venta if fecha_de_venta else datetime.now()
+        self.precio_unitario = precio_unitario
+        self.importe = precio_unitario * cantidad if precio_unitario is not None else None
 
     def __repr__(self):
         return f"Venta {self.id}: ({self.producto_id}) ({self.usuario_id}) ({self.cantidad}) ({self.fecha_de_venta})"
 
     def __str__(self):
         return f"Venta {self.id}: ({self.producto_id}) ({self.usuario_id}) ({self.cantidad}) ({self.fecha_de_venta})"
+
+
+class Carrito(db.Model):
+    """
+    Create a shopping cart (carrito) table. A usuario has at most one cart, it is deleted when the order is placed
+    """
+
+    __tablename__ = "carrito"
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuario.id"), index=True, unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Lines keyed by producto_id, so finding, adding or removing the line of a product is O(1)
+    items = relationship(
+        "CarritoItem",
+        back_populates="carrito",
+        collection_class=attribute_keyed_dict("producto_id"),
+        cascade="all, delete-orphan",
+    )
+
+    def __init__(self, usuario_id):
+        self.usuario_id = usuario_id
+
+    def __repr__(self):
+        return f"Carrito {self.id}: ({self.usuario_id}) ({len(self.items)} items)"
+
+    def __str__(self):
+        return f"Carrito {self.id}: ({self.usuario_id}) ({len(self.items)} items)"
+
+
+class CarritoItem(db.Model):
+    """
+    Create a cart line (carrito_item) table. The name and price of the product are snapshotted when it is added,
+    so the checkout neither re-reads nor re-prices the products
+    """
+
+    __tablename__ = "carrito_item"
+
+    carrito_id = Column(Integer, ForeignKey("carrito.id", ondelete="CASCADE"), primary_key=True)
+    producto_id = Column(Integer, ForeignKey("producto.id"), primary_key=True)
+    nombre = Column(String(100), nullable=False)
+    precio = Column(Float(), nullable=False)
+    cantidad = Column(Integer, nullable=False)
+
+    carrito = relationship("Carrito", back_populates="items")
+
+    def __init__(self, producto_id, nombre, precio, cantidad):
+        self.producto_id = producto_id
+        self.nombre = nombre
+        self.precio = precio
+        self.cantidad = cantidad
+
+    def __repr__(self):
+        return f"CarritoItem {self.carrito_id}: ({self.producto_id}) ({self.cantidad}) ({self.precio})"
+
+    def __str__(self):
+        return f"CarritoItem {self.carrito_id}: ({self.producto_id}) ({self.cantidad}) ({self.precio})"
+
+
+class VentaDiaria(db.Model):
+    """
+    Create a daily sales rollup (venta_diaria) table: the units, revenue and number of sales of each day.
+    It is kept up to date with the venta table (see src/rollups.py), so the dashboards read one row per day
+    """
+
+    __tablename__ = "venta_diaria"
+
+    dia = Column(Date, primary_key=True)
+    ventas = Column(Integer, nullable=False, default=0)
+    unidades = Column(Integer, nullable=False, default=0)
+    importe = Column(Float(), nullable=False, default=0)
+
+    def __repr__(self):
+        return f"VentaDiaria {self.dia}: ({self.ventas}) ({self.unidades}) ({self.importe})"
+
+    def __str__(self):
+        return f"VentaDiaria {self.dia}: ({self.ventas}) ({self.unidades}) ({self.importe})"
+
+
+class VentaDiariaProducto(db.Model):
+    """
+    Create a daily sales per product rollup (venta_diaria_producto) table: the units and revenue of each product
+    and day, so the dashboards read O(days x products) rows instead of every sale
+    """
+
+    __tablename__ = "venta_diaria_producto"
+    __table_args__ = (
+        # Totals per product (all time), without going through the days
+        Index("ix_venta_diaria_producto_producto_id", "producto_id"),
+    )
+
+    dia = Column(Date, primary_key=True)
+    producto_id = Column(Integer, ForeignKey("producto.id"), primary_key=True)
+    unidades = Column(Integer, nullable=False, default=0)
+    importe = Column(Float(), nullable=False, default=0)
+
+    def __repr__(self):
+        return f"VentaDiariaProducto {self.dia}: ({self.producto_id}) ({self.unidades}) ({self.importe})"
+
+    def __str__(self):
+        return f"VentaDiariaProducto {self.dia}: ({self.producto_id}) ({self.unidades}) ({self.importe})"
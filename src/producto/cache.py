@@ -0,0 +1,123 @@
+# Built-in imports
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Thirty part imports
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Local imports
+from ..models import Producto, db
+
+
+class ImagePathCache:
+    """
+    In-process cache of producto_id -> absolute path of its image file, so serving an image does not need a query.
+    The entry of a product is dropped when that product is written (in this process), when it is older than
+    IMAGE_PATH_CACHE_TTL seconds, or when it does not match the image version asked for (written by another process).
+    It keeps up to IMAGE_PATH_CACHE_SIZE products, the oldest entries are dropped first
+    """
+
+    def __init__(self, default_ttl=300, default_size=10_000):
+        self.default_ttl = default_ttl
+        self.default_size = default_size
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return current_app.config.get("IMAGE_PATH_CACHE_TTL", self.default_ttl)
+
+    @property
+    def size(self):
+        return current_app.config.get("IMAGE_PATH_CACHE_SIZE", self.default_size)
+
+    def get(self, producto_id, version=None):
+        """
+        Return the absolute path of the product image, or None when the product has no image (or does not exist).
+        version is the one of image_version() in the URL of the image, when it has one
+        """
+        cached = self._paths.get(producto_id)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            if version is None or image_version(cached[1]) == version:
+                return cached[1]
+
+        image = db.session.query(Producto.image).filter(Producto.id == producto_id).scalar()
+        if not image or not isinstance(image, str):
+            return None
+
+        path = os.path.abspath(os.path.join(current_app.config["UPLOAD_FOLDER"], image))
+        with self._lock:
+            self._paths.pop(producto_id, None)
+            self._paths[producto_id] = (time.monotonic(), path)
+            while len(self._paths) > self.size:
+                self._paths.popitem(last=False)
+        return path
+
+    def invalidate(self, producto_id=None):
+        with self._lock:
+            if producto_id is None:
+                self._paths.clear()
+            else:
+                self._paths.pop(producto_id, None)
+
+
+def image_version(image):
+    """
+    Version of an image in its URLs: the name of its file, the SHA-256 of its content in the image store
+    """
+    return Path(image).stem
+
+
+class CatalogueCache:
+    """
+    In-process cache of values computed over the whole catalogue (the number of products matching a set of filters,
+    the categories). Values expire after PRODUCT_COUNT_CACHE_TTL seconds and are dropped when a product is written
+    """
+
+    def __init__(self, default_ttl=60):
+        self.default_ttl = default_ttl
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return current_app.config.get("PRODUCT_COUNT_CACHE_TTL", self.default_ttl)
+
+    def get(self, key, compute):
+        """
+        Return the cached value of key (hashable), calling compute() when it is not cached or has expired
+        """
+        cached = self._values.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+
+        value = compute()
+        with self._lock:
+            self._values[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._values.clear()
+
+
+image_path_cache = ImagePathCache()
+product_count_cache = CatalogueCache()
+categorias_cache = CatalogueCache()
+
+
+@event.listens_for(Session, "after_flush")
+def invalidate_product_caches_on_flush(session, flush_context):
+    productos = [
+        instance for instance in session.new | session.dirty | session.deleted if isinstance(instance, Producto)
+    ]
+    for producto in productos:
+        image_path_cache.invalidate(producto.id)
+    if productos:
+        product_count_cache.invalidate()
+        categorias_cache.invalidate()
@@ -0,0 +1,108 @@
+# Built-in imports
+from collections import namedtuple
+
+# Thirty part imports
+from flask import abort, session
+
+# Local imports
+from ..models import Carrito, CarritoItem, Producto, db
+
+# The cookie session only carries the id of the cart, its lines are in the database
+CART_SESSION_KEY = "carrito_id"
+
+# One line of the cart: the product data needed by the checkout pages plus the line total
+CartLine = namedtuple("CartLine", ["product_id", "nombre", "precio", "cantidad", "subtotal"])
+
+
+class PricedCart:
+    """
+    The lines of a cart with their totals, built from the prices snapshotted when the products were added
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.total = sum(line.subtotal for line in lines)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+
+def get_current_cart(usuario_id, create=False):
+    """
+    Return the cart of the usuario (the one in the session, or the one kept from a previous session).
+    With create, a new empty cart is added when there is none. Otherwise None is returned
+    """
+    carrito_id = session.get(CART_SESSION_KEY)
+    carrito = db.session.get(Carrito, carrito_id) if carrito_id else None
+    if carrito is None or carrito.usuario_id != usuario_id:
+        carrito = Carrito.query.filter_by(usuario_id=usuario_id).one_or_none()
+    if carrito is None and create:
+        carrito = Carrito(usuario_id)
+        db.session.add(carrito)
+        db.session.flush()
+
+    if carrito is not None:
+        session[CART_SESSION_KEY] = carrito.id
+    else:
+        session.pop(CART_SESSION_KEY, None)
+    return carrito
+
+
+def get_cart_or_404(carrito_id, usuario_id):
+    """
+    Return the cart with the given id, which must belong to the usuario
+    """
+    carrito = db.session.get(Carrito, carrito_id) if carrito_id else None
+    if carrito is None or carrito.usuario_id != usuario_id:
+        abort(404)
+    return carrito
+
+
+def add_items(carrito, quantities):
+    """
+    Add products to the cart ({product_id: quantity}), or set the quantity of the ones already in it.
+    The name and price of the new products are snapshotted with a single IN (...) query
+    """
+    quantities = {int(product_id): int(cantidad) for product_id, cantidad in quantities.items() if int(cantidad) > 0}
+    new_ids = [product_id for product_id in quantities if product_id not in carrito.items]
+    if new_ids:
+        rows = db.session.query(Producto.id, Producto.nombre, Producto.precio).filter(Producto.id.in_(new_ids)).all()
+        # An unknown product aborts the checkout
+        if len(rows) != len(new_ids):
+            abort(404)
+        for row in rows:
+            carrito.items[row.id] = CarritoItem(row.id, row.nombre, row.precio, quantities[row.id])
+
+    for product_id, cantidad in quantities.items():
+        carrito.items[product_id].cantidad = cantidad
+
+
+def update_item(carrito, product_id, cantidad):
+    """
+    Set the quantity of a line of the cart (a quantity of 0 or less removes it)
+    """
+    if cantidad <= 0:
+        remove_item(carrito, product_id)
+    elif product_id in carrito.items:
+        carrito.items[product_id].cantidad = cantidad
+
+
+def remove_item(carrito, product_id):
+    carrito.items.pop(product_id, None)
+
+
+def priced_cart(carrito):
+    """
+    Return the PricedCart of a cart, without querying the products again
+    """
+    if carrito is None:
+        return PricedCart([])
+    return PricedCart(
+        [
+            CartLine(item.producto_id, item.nombre, item.precio, item.cantidad, item.precio * item.cantidad)
+            for item in carrito.items.values()
+        ]
+    )
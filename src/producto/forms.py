@@ -37,7 +37,7 @@ class ProductoForm(BaseForm):
     categoria = SelectField("Categoría", validators=[DataRequired()])
     imagen = FileField(
         "Imagen",
-        validators=[FileAllowed(["jpg", "jpeg", "png", "svg", "gif", "bmp"], "Solo se permiten archivos de imagen.")],
+        validators=[FileAllowed(["jpg", "jpeg", "png", "gif", "bmp", "webp"], "Solo se permiten archivos de imagen.")],
     )
 
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,93 @@
+# Built-in imports
+import base64
+import binascii
+import json
+
+# Thirty part imports
+from sqlalchemy import tuple_
+
+# Local imports
+
+
+class KeysetPage:
+    """
+    A page of a keyset (seek) pagination. Instead of page numbers it carries the cursors of the previous and next
+    pages, so fetching any page costs the same whatever its position
+    """
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(values, direction):
+    """
+    Build the opaque cursor token that points after (direction "next") or before (direction "prev") values
+    """
+    payload = json.dumps({"k": list(values), "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Return the (values, direction) of a cursor token. Raise ValueError when the token is not valid
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        values, direction = payload["k"], payload["d"]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as error:
+        raise ValueError(f"Invalid cursor: {token}") from error
+
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {token}")
+    # The values are bound as query parameters: only scalars (JSON numbers and strings) are accepted
+    if any(isinstance(value, bool) or not isinstance(value, (int, float, str)) for value in values):
+        raise ValueError(f"Invalid cursor: {token}")
+    return values, direction
+
+
+def paginate_keyset(query, columns, cursor=None, per_page=10):
+    """
+    Paginate query ordered by columns (the last one must be unique, e.g. the primary key) seeking from the cursor.
+    The items may be ORM instances or rows, they only need an attribute named as each column
+    """
+    values, direction = decode_cursor(cursor) if cursor else (None, "next")
+    if values is not None and len(values) != len(columns):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    key = tuple_(*columns) if len(columns) > 1 else columns[0]
+    if direction == "next":
+        if values is not None:
+            query = query.filter(key > (tuple_(*values) if len(columns) > 1 else values[0]))
+        query = query.order_by(*[column.asc() for column in columns])
+    else:
+        query = query.filter(key < (tuple_(*values) if len(columns) > 1 else values[0]))
+        query = query.order_by(*[column.desc() for column in columns])
+
+    # One extra row tells whether there is another page in the same direction
+    items = query.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if direction == "prev":
+        items.reverse()
+
+    def item_key(item):
+        return [getattr(item, column.key) for column in columns]
+
+    has_next = has_more if direction == "next" else True
+    has_prev = values is not None if direction == "next" else has_more
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(item_key(items[-1]), "next") if items and has_next else None,
+        prev_cursor=encode_cursor(item_key(items[0]), "prev") if items and has_prev else None,
+    )
@@ -1,24 +1,37 @@
 # src/producto/views.py
 # Built-in imports
-import json
 import os
 from datetime import datetime
-from io import BytesIO
 
 # Third-party imports
-from flask import redirect, url_for, render_template, request, session, send_file, jsonify, flash, current_app
+from flask import redirect, url_for, render_template, request, session, send_file, jsonify, flash, current_app, abort
 from flask_login import login_required, current_user
+from sqlalchemy import bindparam, insert, update
 
 # Local imports
+from src.engine import replica_reads
 from src.models import Producto, db, Venta
+from src.rollups import record_sales
+from src.utils.image_store import InvalidImageError
+from src.utils.thumbnails import THUMBNAIL_SIZES, thumbnail_path
 from . import producto
+from .cache import categorias_cache, image_path_cache, image_version, product_count_cache
+from .cart import (
+    CART_SESSION_KEY,
+    add_items,
+    get_cart_or_404,
+    get_current_cart,
+    priced_cart,
+    remove_item,
+    update_item,
+)
+from .pagination import paginate_keyset
 
 
 @producto.route("/add_producto", methods=["POST"])
 @login_required
 def add_producto():
     image_file = request.files["image"]
-    image_data = image_file.read()
 
     # Create a new Producto instance
     producto = Producto(
@@ -27,17 +40,27 @@ def add_producto():
         categoria=request.form["categoria"],
         precio=float(request.form["precio"]),
         stock=int(request.form["stock"]),
-        image=image_data,  # Store the binary image data
+        image=None,
     )
+    # The upload is only streamed to a temporary file here, it is processed in the background after the commit
+    try:
+        producto.save_images(image_file)
+    except InvalidImageError as error:
+        return jsonify({"error": str(error)}), 400
 
     # Save the Producto instance to the database
     db.session.add(producto)
     db.session.commit()
 
-    return "Producto added successfully"
+    status_url = url_for("producto_bp.get_producto", producto_id=producto.id)
+    response = jsonify({"id": producto.id, "image_status": producto.image_status, "status_url": status_url})
+    response.status_code = 202
+    response.headers["Location"] = status_url
+    return response
 
 
 @producto.route("/get_producto/<int:producto_id>")
+@replica_reads
 def get_producto(producto_id):
     product_fetched = Producto.query.get_or_404(producto_id)
 
@@ -50,100 +73,154 @@ def get_producto(producto_id):
             "precio": product_fetched.precio,
             "stock": product_fetched.stock,
             "image": product_fetched.image,
+            "image_status": product_fetched.image_status,
         }
     )
 
 
 @producto.route("/get_producto_image/<int:producto_id>")
 def get_producto_image(producto_id):
-    producto = Producto.query.get_or_404(producto_id)
-    image_path = os.path.join(current_app.config["UPLOAD_FOLDER"], producto.image)
+    # v (see producto_image_url) changes with the image: the browsers can keep a URL for IMAGE_CACHE_MAX_AGE, and a
+    # process that cached the previous path of the image looks it up again
+    image_path = image_path_cache.get(producto_id, request.args.get("v"))
 
     # Check if the image file exists
-    if not os.path.exists(image_path):
+    if image_path is None or not os.path.isfile(image_path):
         return "Image not found", 404
 
-    # Read the image file and return its data
-    with open(image_path, "rb") as f:
-        image_data = f.read()
+    # Serve the smallest pre-generated variant that covers the requested size (WebP when the browser accepts it)
+    size = request.args.get("size", type=int)
+    variant_path = get_thumbnail_path(image_path, size) if size else None
+    if variant_path:
+        response = send_file(variant_path, max_age=current_app.config["IMAGE_CACHE_MAX_AGE"])
+        response.vary.add("Accept")
+        return response
+
+    # Stream the file from disk (sendfile when the server supports it). The mimetype is guessed from the file name,
+    # and the ETag/Last-Modified headers let the browsers revalidate with a 304 instead of downloading it again
+    response = send_file(
+        image_path,
+        conditional=True,
+        etag=True,
+        max_age=current_app.config["IMAGE_CACHE_MAX_AGE"],
+    )
+    if response.mimetype == "image/svg+xml":
+        # SVG images uploaded before they were rejected: they can contain scripts, never run them from our origin
+        response.headers["Content-Security-Policy"] = "sandbox"
+    return response
 
-    return send_file(BytesIO(image_data), mimetype="image/jpeg")
 
+@producto.app_template_global()
+def producto_image_url(producto, size=None):
+    """
+    URL of the image of a product, versioned by its image (the URL changes when the image does)
+    """
+    version = image_version(producto.image) if producto.image and isinstance(producto.image, str) else None
+    return url_for("producto_bp.get_producto_image", producto_id=producto.id, size=size, v=version)
 
-@producto.route("/lista_productos", methods=("GET", "POST"))
-def lista_productos():
-    page = request.args.get("page", 1, type=int)
-    productos = Producto.query.filter(Producto.stock > 0).paginate(page=page, per_page=10, error_out=False)
 
-    if request.method == "POST":
-        selected_products = {}
-        for key, value in request.form.items():
-            if key.startswith("selected_products[]"):
-                product_id = value
-                quantity_key = f"product_quantity_{product_id}"
-                quantity_value = request.form.get(quantity_key, 0)
-                selected_products[product_id] = int(quantity_value)
-
-        session["selected_products"] = selected_products
+@producto.route("/lista_productos")
+@replica_reads
+def lista_productos():
+    filters = get_catalogue_filters()
+    sort_columns = CATALOGUE_SORTS[filters["orden"]]
+
+    # Keyset pagination: the page is fetched seeking from the cursor, never with OFFSET
+    try:
+        productos = paginate_keyset(
+            filter_catalogue(Producto.query, filters),
+            sort_columns,
+            cursor=request.args.get("cursor"),
+            per_page=current_app.config["PRODUCTOS_PER_PAGE"],
+        )
+    except ValueError:
+        abort(400)
 
-        return redirect(url_for("producto.review_checkout"))
+    # Counting all the matching products is optional (?count=1) and cached per set of filters
+    if request.args.get("count", 0, type=int):
+        productos.total = product_count_cache.get(
+            tuple(sorted(filters.items())), lambda: filter_catalogue(Producto.query, filters).count()
+        )
 
     return render_template(
-        "productos/productos.html", productos=productos, title="Lista productos", get_product_name=get_product_name
+        "productos/productos.html",
+        productos=productos,
+        filters=filters,
+        categorias=get_categorias(),
+        title="Lista productos",
     )
 
 
-@producto.route("/review_checkout", methods=["POST"])
+@producto.route("/review_checkout", methods=["GET", "POST"])
 @login_required
 def review_checkout():
-    selected_products = {}
-    for key, value in request.form.items():
-        if "selected_products" in key:
-            continue
-        product_id = key.replace("product_", "")
-        quantity_key = f"product_{product_id}"
-        quantity_value = request.form.get(quantity_key, 0)
-        selected_products[product_id] = int(quantity_value)
+    if request.method == "POST":
+        # The products selected in the catalogue: product_<id> = quantity
+        quantities = {}
+        for key, value in request.form.items():
+            if key.startswith("product_"):
+                quantities[key.replace("product_", "")] = int(value or 0)
+
+        carrito = get_current_cart(current_user.id, create=True)
+        add_items(carrito, quantities)
+        db.session.commit()
+        return redirect(url_for("producto_bp.review_checkout"))
 
-    total_amount = total_amount_to_pay(selected_products)
+    carrito = get_current_cart(current_user.id)
+    if carrito is None or not carrito.items:
+        flash("Tu carrito está vacío.", "info")
+        return redirect(url_for("producto_bp.lista_productos"))
 
-    product_names = {product_id: get_product_name(product_id) for product_id in selected_products.keys()}
+    cart = priced_cart(carrito)
 
     return render_template(
         "productos/review_checkout.html",
-        selected_products=selected_products,
-        product_names=product_names,
-        total_amount=total_amount,
+        carrito=carrito,
+        cart=cart,
+        total_amount=cart.total,
     )
 
 
+@producto.route("/carrito/<int:producto_id>/actualizar", methods=["POST"])
+@login_required
+def update_cart_item(producto_id):
+    carrito = get_current_cart(current_user.id)
+    if carrito is not None:
+        update_item(carrito, producto_id, request.form.get("cantidad", 0, type=int))
+        db.session.commit()
+    return redirect(url_for("producto_bp.review_checkout"))
+
+
+@producto.route("/carrito/<int:producto_id>/quitar", methods=["POST"])
+@login_required
+def remove_cart_item(producto_id):
+    carrito = get_current_cart(current_user.id)
+    if carrito is not None:
+        remove_item(carrito, producto_id)
+        db.session.commit()
+    return redirect(url_for("producto_bp.review_checkout"))
+
+
 @producto.route("/confirm_checkout", methods=["POST"])
 @login_required
 def confirm_checkout():
-    # Gets the key 'selected_products'. It returns a dict as a string.
-    # We need also replace single quotes to double quotes to use json.loads (to convert to real dict)
-    selected_products = request.form.get("selected_products").replace("'", '"')
-    selected_products = json.loads(selected_products)
-
-    total_amount = total_amount_to_pay(selected_products)
-    product_names = {product_id: get_product_name(product_id) for product_id in selected_products.keys()}
-
-    # Save the purchased products to the database
-    for product_id, quantity in selected_products.items():
-        venta = Venta(
-            producto_id=int(product_id),
-            usuario_id=current_user.id,
-            cantidad=int(quantity),
-            fecha_de_venta=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        )
-        db.session.add(venta)
-    db.session.commit()
+    # The cart is read by its id, with the prices snapshotted when the products were added
+    carrito = get_cart_or_404(request.form.get("carrito_id", type=int), current_user.id)
+    cart = priced_cart(carrito)
+
+    # Save the purchased products to the database and take them out of stock, all or nothing
+    failed_lines = place_order(current_user.id, cart, carrito)
+    if failed_lines:
+        product_list = ", ".join(line.nombre for line in failed_lines)
+        flash(f"No hay stock suficiente para: {product_list}. No se ha realizado la compra.", "error")
+        return redirect(url_for("producto_bp.review_checkout"))
+
+    session.pop(CART_SESSION_KEY, None)
 
     return render_template(
         "productos/confirm_checkout.html",
-        selected_products=selected_products,
-        product_names=product_names,
-        total_amount=total_amount,
+        cart=cart,
+        total_amount=cart.total,
     )
 
 
@@ -160,20 +237,143 @@ def buy_products():
     return redirect(url_for("producto_bp.lista_productos"))
 
 
-def get_product_name(product_id):
-    prod = Producto.query.get(product_id)
-    return prod.nombre if prod else "Producto desconocido"
-
+# Orders of the catalogue: {name: columns of the keyset}. Both are served by an index (SQLite indexes end with the id)
+CATALOGUE_SORTS = {
+    "id": (Producto.id,),
+    "precio": (Producto.precio, Producto.id),
+}
+
+
+def get_catalogue_filters():
+    """
+    Read the catalogue filters from the query string
+    """
+    orden = request.args.get("orden", "id")
+    return {
+        "orden": orden if orden in CATALOGUE_SORTS else "id",
+        "categoria": request.args.get("categoria") or None,
+        "precio_min": request.args.get("precio_min", type=float),
+        "precio_max": request.args.get("precio_max", type=float),
+        # As before, only the products in stock are listed unless asked otherwise
+        "en_stock": request.args.get("en_stock", 1, type=int) == 1,
+    }
+
+
+def filter_catalogue(query, filters):
+    """
+    Apply the catalogue filters (categoria, price range and in stock) to a query on Producto
+    """
+    if filters["categoria"] is not None:
+        query = query.filter(Producto.categoria == filters["categoria"])
+    if filters["precio_min"] is not None:
+        query = query.filter(Producto.precio >= filters["precio_min"])
+    if filters["precio_max"] is not None:
+        query = query.filter(Producto.precio <= filters["precio_max"])
+    if filters["en_stock"]:
+        query = query.filter(Producto.stock > 0)
+    return query
+
+
+def get_categorias():
+    """
+    Distinct categories of the catalogue (read from the categoria index), cached like the product counts
+    """
+    return categorias_cache.get(
+        "categorias",
+        lambda: [
+            categoria for (categoria,) in db.session.query(Producto.categoria).distinct().order_by(Producto.categoria)
+        ],
+    )
 
-def get_product_price(product_id):
-    producto = Producto.query.get_or_404(product_id)
-    return producto.precio
 
+def get_thumbnail_path(image_path, size):
+    """
+    Return the path of the thumbnail of image_path that best fits size, or None if it has not been generated
+    """
+    fitting_sizes = [thumbnail_size for thumbnail_size in THUMBNAIL_SIZES if thumbnail_size >= size]
+    if not fitting_sizes:
+        return None
+
+    # Only when WebP is listed explicitly: browsers that can not decode it still send wildcards like image/*
+    accepts_webp = any(mimetype == "image/webp" for mimetype, _ in request.accept_mimetypes)
+    extensions = ["webp", None] if accepts_webp else [None]
+    for extension in extensions:
+        variant_path = thumbnail_path(image_path, fitting_sizes[0], extension)
+        if variant_path.is_file():
+            return str(variant_path)
+    return None
+
+
+def place_order(usuario_id, cart, carrito=None):
+    """
+    Register the sales of a priced cart in a single transaction: one conditional UPDATE (executemany) takes the
+    quantities out of stock, then one bulk INSERT adds the Venta rows, the daily rollups are updated (and the
+    carrito, if given, is deleted).
+    Stock is only decremented when "stock >= cantidad", so concurrent buyers can never oversell a product.
+    If any line can not be served, nothing is committed and the failed lines are returned
+    """
+    if not cart.lines:
+        return []
+
+    decrement_stock = (
+        update(Producto.__table__)
+        .where(Producto.__table__.c.id == bindparam("line_id"))
+        .where(Producto.__table__.c.stock >= bindparam("cantidad"))
+        .values(stock=Producto.__table__.c.stock - bindparam("cantidad"))
+    )
 
-def total_amount_to_pay(selected_products):
-    # {6: 2, 7: 2}
-    total_amount = 0
-    for product_id, quantity in selected_products.items():
-        price = get_product_price(product_id)
-        total_amount += price * quantity
-    return total_amount
+    try:
+        result = db.session.execute(
+            decrement_stock, [{"line_id": line.product_id, "cantidad": line.cantidad} for line in cart.lines]
+        )
+        if result.rowcount != len(cart.lines):
+            db.session.rollback()
+            return get_out_of_stock_lines(cart)
+
+        fecha_de_venta = datetime.now()
+        db.session.execute(
+            insert(Venta),
+            [
+                {
+                    "producto_id": line.product_id,
+                    "usuario_id": usuario_id,
+                    "cantidad": line.cantidad,
+                    "fecha_de_venta": fecha_de_venta,
+                    "precio_unitario": line.precio,
+                    "importe": line.subtotal,
+                }
+                for line in cart.lines
+            ],
+        )
+        # The daily rollups of the dashboards are updated in the same transaction
+        record_sales(
+            [
+                {
+                    "producto_id": line.product_id,
+                    "cantidad": line.cantidad,
+                    "importe": line.subtotal,
+                    "fecha_de_venta": fecha_de_venta,
+                }
+                for line in cart.lines
+            ]
+        )
+        if carrito is not None:
+            db.session.delete(carrito)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return []
+
+
+def get_out_of_stock_lines(cart):
+    """
+    Return the cart lines that ask for more units than there are in stock
+    """
+    stock = dict(
+        db.session.query(Producto.id, Producto.stock)
+        .filter(Producto.id.in_([line.product_id for line in cart.lines]))
+        .all()
+    )
+    return [line for line in cart.lines if stock.get(line.product_id, 0) < line.cantidad]
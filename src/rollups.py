@@ -0,0 +1,184 @@
+# Built-in imports
+import datetime
+from collections import defaultdict
+
+# Thirty part imports
+from sqlalchemy import Date, bindparam, delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Local imports
+from .models import Producto, Venta, VentaDiaria, VentaDiariaProducto, db
+
+# The daily rollups (venta_diaria and venta_diaria_producto) are maintained in the same transaction as the sales:
+# - record_sales() adds the sales inserted in bulk (the checkout) with an upsert per day and per (day, product)
+# - the listeners below rebuild the days of the sales written through the ORM (e.g. the admin)
+# - rebuild_rollups() recomputes a range of days from the venta table (flask rebuild-rollups)
+
+
+def upsert(table, rows, key_columns, sum_columns, session=None):
+    """
+    INSERT the rows, adding their sum_columns to the existing row when the key is already there
+    """
+    session = session or db.session
+    dialect = session.get_bind().dialect
+    table = table.__table__
+    if dialect.name in ("sqlite", "postgresql"):
+        statement = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}[dialect.name](table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[column] for column in key_columns],
+            set_={column: table.c[column] + statement.excluded[column] for column in sum_columns},
+        )
+    elif dialect.name in ("mysql", "mariadb"):
+        statement = mysql.insert(table)
+        statement = statement.on_duplicate_key_update(
+            {column: table.c[column] + statement.inserted[column] for column in sum_columns}
+        )
+    else:
+        # No upsert in the dialect: UPDATE the existing keys, then INSERT the missing ones. Two checkouts adding the
+        # first sale of a key at the same time can conflict on the INSERT, the checkout then rolls back
+        statement = update(table).where(*(table.c[column] == bindparam(f"key_{column}") for column in key_columns))
+        statement = statement.values({column: table.c[column] + bindparam(f"sum_{column}") for column in sum_columns})
+        missing = []
+        for row in rows:
+            params = {f"key_{column}": row[column] for column in key_columns}
+            params.update({f"sum_{column}": row[column] for column in sum_columns})
+            if session.execute(statement, params).rowcount == 0:
+                missing.append(row)
+        if missing:
+            session.execute(insert(table), missing)
+        return
+    session.execute(statement, rows)
+
+
+def record_sales(sales, session=None):
+    """
+    Add sales to the daily rollups. sales are dicts with producto_id, cantidad, importe and fecha_de_venta.
+    It does not commit: it is meant to run in the transaction that inserts the sales
+    """
+    per_product = defaultdict(lambda: [0, 0.0])
+    per_day = defaultdict(lambda: [0, 0, 0.0])
+    for sale in sales:
+        dia = sale["fecha_de_venta"].date()
+        per_product[(dia, sale["producto_id"])][0] += sale["cantidad"]
+        per_product[(dia, sale["producto_id"])][1] += sale["importe"]
+        per_day[dia][0] += 1
+        per_day[dia][1] += sale["cantidad"]
+        per_day[dia][2] += sale["importe"]
+    if not per_day:
+        return
+
+    upsert(
+        VentaDiariaProducto,
+        [
+            {"dia": dia, "producto_id": producto_id, "unidades": unidades, "importe": importe}
+            for (dia, producto_id), (unidades, importe) in per_product.items()
+        ],
+        ("dia", "producto_id"),
+        ("unidades", "importe"),
+        session,
+    )
+    upsert(
+        VentaDiaria,
+        [
+            {"dia": dia, "ventas": ventas, "unidades": unidades, "importe": importe}
+            for dia, (ventas, unidades, importe) in per_day.items()
+        ],
+        ("dia",),
+        ("ventas", "unidades", "importe"),
+        session,
+    )
+
+
+def day_bounds(start_day, end_day):
+    """
+    Datetime bounds [start, end) of the days from start_day to end_day (both included)
+    """
+    start = datetime.datetime.combine(start_day, datetime.time())
+    end = datetime.datetime.combine(end_day + datetime.timedelta(days=1), datetime.time())
+    return start, end
+
+
+def rebuild_rollups(start_day=None, end_day=None, session=None):
+    """
+    Recompute the rollups of the days from start_day to end_day (both included, all the history by default) from
+    the venta table, in session (db.session by default). It does not commit
+    """
+    session = session or db.session
+    dia = func.date(Venta.fecha_de_venta, type_=Date)
+    importe = func.sum(Venta.importe)
+    sales = select().select_from(Venta)
+    bounds = None
+    if start_day is not None or end_day is not None:
+        bounds = day_bounds(start_day or datetime.date.min, end_day or datetime.date.max - datetime.timedelta(days=1))
+        sales = sales.where(Venta.fecha_de_venta >= bounds[0], Venta.fecha_de_venta < bounds[1])
+
+    for model in (VentaDiariaProducto, VentaDiaria):
+        statement = delete(model)
+        if bounds:
+            statement = statement.where(model.dia >= bounds[0].date(), model.dia < bounds[1].date())
+        session.execute(statement)
+
+    # The sales of deleted products (kept by the databases created before foreign keys were enforced) only count in
+    # the daily totals: venta_diaria_producto references producto
+    session.execute(
+        insert(VentaDiariaProducto).from_select(
+            ["dia", "producto_id", "unidades", "importe"],
+            sales.join(Producto, Producto.id == Venta.producto_id)
+            .add_columns(dia, Venta.producto_id, func.sum(Venta.cantidad), importe)
+            .group_by(dia, Venta.producto_id),
+        )
+    )
+    session.execute(
+        insert(VentaDiaria).from_select(
+            ["dia", "ventas", "unidades", "importe"],
+            sales.add_columns(dia, func.count(Venta.id), func.sum(Venta.cantidad), importe).group_by(dia),
+        )
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def fill_venta_importe(session, flush_context, instances):
+    # Sales created without a price (e.g. from the admin) are sold at the current price of the product, and the
+    # importe follows the quantity when it is edited
+    for instance in session.new | session.dirty:
+        if not isinstance(instance, Venta):
+            continue
+        if instance.precio_unitario is None:
+            instance.precio_unitario = (
+                session.query(Producto.precio).filter(Producto.id == instance.producto_id).scalar()
+            )
+        if instance.precio_unitario is not None and instance.cantidad is not None:
+            instance.importe = instance.precio_unitario * instance.cantidad
+
+
+@event.listens_for(Session, "before_flush")
+def collect_rollup_days(session, flush_context, instances):
+    # Sales added, edited or deleted one by one (e.g. from the admin): their days are rebuilt before the commit
+    for instance in session.new | session.dirty | session.deleted:
+        if not isinstance(instance, Venta):
+            continue
+        fechas = inspect(instance).attrs.fecha_de_venta.history
+        for fecha in [instance.fecha_de_venta, *fechas.deleted]:
+            if fecha is not None:
+                session.info.setdefault("rollup_days", set()).add(fecha.date())
+
+
+@event.listens_for(Session, "before_commit")
+def rebuild_rollup_days_before_commit(session):
+    # before_commit runs before the flush of the commit: flush the pending sales to collect their days. Sessions that
+    # did not touch a sale (most of them) return without flushing
+    pending = session.new | session.dirty | session.deleted
+    if not session.info.get("rollup_days") and not any(isinstance(instance, Venta) for instance in pending):
+        return
+    session.flush()
+    if not session.info.get("rollup_days"):
+        return
+    # In the session that commits, so the rebuild is part of its transaction
+    for dia in sorted(session.info.pop("rollup_days")):
+        rebuild_rollups(dia, dia, session)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_rollup_days_after_rollback(session):
+    session.info.pop("rollup_days", None)
@@ -1,6 +1,6 @@
 # Built-in imports
 # Thirty part imports
-from flask import render_template, flash, redirect, url_for
+from flask import abort, render_template, flash, redirect, url_for
 from flask_login import login_required, current_user
 from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
@@ -9,6 +9,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from . import usuario
 from .forms import UsuarioForm
 from .. import db
+from ..auth.cache import identity_cache
 from ..models import Usuario, Producto, Venta
 
 
@@ -19,7 +20,8 @@ def usuario_detalles():
     Show the user detail
     """
 
-    usuario_obj: Usuario = Usuario.query.get_or_404(current_user.id)
+    # current_user is the cached snapshot of the user, no need to query it again
+    usuario_obj = current_user._get_current_object()
     return render_template("usuarios/users.html", usuario=usuario_obj, title="Usuario Detalles")
 
 
@@ -74,8 +76,10 @@ def dashboard(usuario_id):
     Generate the user's dashboard
     """
 
-    # Get the user object from DB
-    usuario_obj = Usuario.query.get_or_404(usuario_id)
+    # Get the user (snapshot) from the identity cache
+    usuario_obj = identity_cache.get(usuario_id)
+    if usuario_obj is None:
+        abort(404)
 
     # Query the Venta table to get the products bought by the user
     user_products = (
@@ -0,0 +1,144 @@
+# Built-in imports
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+# Local imports
+
+# Images are saved in UPLOAD_FOLDER/images, named after the SHA-256 of their content: the same image uploaded twice (or
+# for several products) is stored only once, and a name never points to different contents
+IMAGE_FOLDER = "images"
+CHUNK_SIZE = 64 * 1024
+
+# Image of the products without one (shipped with the app, not in the store)
+GENERIC_PRODUCT_IMAGE = "images/generic-product.png"
+
+# Leading bytes ("magic numbers") of the supported image formats. SVG is not accepted: it is a text (XML) format with
+# no signature, and an SVG served from our origin can run scripts
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+
+
+def detect_image_extension(head):
+    """
+    Return the extension of the image format of head (the first bytes of the file), or None when it is not an image
+    """
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def image_relative_path(digest, extension):
+    """
+    Path (relative to the upload folder, as saved in Producto.image) of the image with the given SHA-256 digest
+    """
+    return Path(IMAGE_FOLDER) / f"{digest}.{extension.lower()}"
+
+
+class InvalidImageError(ValueError):
+    """
+    The uploaded file is not an image of a supported format, or it is too large
+    """
+
+
+class SpooledImage:
+    """
+    An image copied to a temporary file of the image folder, waiting to be moved to its content-addressed name
+    """
+
+    def __init__(self, path, digest, extension):
+        self.path = Path(path)
+        self.digest = digest
+        self.extension = extension
+
+    @property
+    def relative_path(self):
+        return image_relative_path(self.digest, self.extension)
+
+    def discard(self):
+        self.path.unlink(missing_ok=True)
+
+
+def spool_image(stream, upload_folder, max_size=None):
+    """
+    Copy stream (a binary file object) in chunks to a temporary file of the image folder, hashing it on the way.
+    The format is taken from the magic bytes of the first chunk, not from the file name.
+    Raise InvalidImageError when it is not a supported image or it has more than max_size bytes
+    """
+    image_folder = Path(upload_folder) / IMAGE_FOLDER
+    image_folder.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    extension = None
+    size = 0
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=image_folder, prefix=".upload-")
+    try:
+        with os.fdopen(file_descriptor, "wb") as temporary_file:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                if extension is None:
+                    extension = detect_image_extension(chunk)
+                    if extension is None:
+                        raise InvalidImageError("El archivo no es una imagen válida.")
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise InvalidImageError(f"La imagen supera el tamaño máximo ({max_size // (1024 * 1024)} MB).")
+                digest.update(chunk)
+                temporary_file.write(chunk)
+        if extension is None:
+            raise InvalidImageError("El archivo está vacío.")
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+    return SpooledImage(temporary_path, digest.hexdigest(), extension)
+
+
+def commit_spooled_image(spooled_image, upload_folder):
+    """
+    Move a spooled image to its content-addressed name (or drop it when the same image is already stored).
+    Return its path relative to upload_folder
+    """
+    full_path = Path(upload_folder) / spooled_image.relative_path
+    if full_path.exists():
+        spooled_image.discard()
+    else:
+        os.chmod(spooled_image.path, 0o644)
+        # Atomic: a concurrent upload of the same image just replaces it with the same content
+        os.replace(spooled_image.path, full_path)
+    return spooled_image.relative_path
+
+
+def store_image(stream, upload_folder, max_size=None):
+    """
+    Save the content of stream in the image store and return its path relative to upload_folder
+    """
+    return commit_spooled_image(spool_image(stream, upload_folder, max_size), upload_folder)
+
+
+def store_image_bytes(data, upload_folder, extension=None):
+    """
+    Save an image held in memory (e.g. a legacy blob) in the image store. The extension is detected from its content
+    when it is not given. Return its path relative to upload_folder, or None when the data is not an image
+    """
+    extension = extension or detect_image_extension(bytes(data[:1024]))
+    if extension is None:
+        return None
+
+    digest = hashlib.sha256(data).hexdigest()
+    relative_path = image_relative_path(digest, extension)
+    full_path = Path(upload_folder) / relative_path
+    if not full_path.exists():
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = full_path.with_name(f".upload-{digest}")
+        temporary_path.write_bytes(data)
+        os.replace(temporary_path, full_path)
+    return relative_path
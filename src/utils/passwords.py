@@ -0,0 +1,47 @@
+# Built-in imports
+# Thirty part imports
+import bcrypt
+from flask import current_app, has_app_context
+
+# Local imports
+
+# Work factor used when BCRYPT_ROUNDS is not configured. Every extra round doubles the time of a hash (and a login)
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def get_rounds():
+    if has_app_context():
+        return current_app.config.get("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS)
+    return DEFAULT_BCRYPT_ROUNDS
+
+
+def hash_password(password, rounds=None):
+    """
+    Return the bcrypt hash (a str like "$2b$12$...") of password, with the configured cost unless rounds is given
+    """
+    salt = bcrypt.gensalt(rounds=rounds or get_rounds())
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("ascii")
+
+
+def is_password_hash(value):
+    return isinstance(value, str) and value.startswith(("$2a$", "$2b$", "$2y$")) and len(value) == 60
+
+
+def hash_rounds(password_hash):
+    return int(password_hash.split("$")[2])
+
+
+def verify_password(password, password_hash):
+    """
+    Check password against a bcrypt hash. Values that are not a hash never match
+    """
+    if not password or not is_password_hash(password_hash):
+        return False
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("ascii"))
+
+
+def needs_rehash(password_hash, rounds=None):
+    """
+    True when password_hash was made with another cost than the configured one (e.g. after changing BCRYPT_ROUNDS)
+    """
+    return not is_password_hash(password_hash) or hash_rounds(password_hash) != (rounds or get_rounds())
@@ -0,0 +1,170 @@
+# Built-in imports
+import datetime
+
+# Third-party imports
+import numpy as np
+from sqlalchemy import bindparam, func, insert, update
+
+# Local imports
+from src.models import Producto, Usuario, Venta, db
+from src.rollups import rebuild_rollups
+from src.utils.image_store import GENERIC_PRODUCT_IMAGE
+from src.utils.passwords import hash_password
+
+DEFAULT_BATCH_SIZE = 50_000
+SYNTHETIC_CATEGORIES = ["Laptop", "Desktop", "Periferico", "Otros"]
+
+
+def random_datetimes(rng, start_date, end_date, size, sort=False):
+    """
+    Return size random datetimes between start_date and end_date (vectorized with NumPy)
+    """
+    span = max(int((end_date - start_date).total_seconds()), 1)
+    seconds = rng.integers(0, span, size=size)
+    if sort:
+        seconds.sort()
+    return (np.datetime64(start_date, "s") + seconds.astype("timedelta64[s]")).astype(datetime.datetime).tolist()
+
+
+def insert_in_batches(table, total, make_batch, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Insert total rows in table with one executemany per batch, each batch in its own transaction.
+    make_batch(offset, size) returns the list of rows (dicts) of a batch
+    """
+    inserted = 0
+    while inserted < total:
+        size = min(batch_size, total - inserted)
+        db.session.execute(insert(table), make_batch(inserted, size))
+        db.session.commit()
+        inserted += size
+        if progress:
+            progress(inserted)
+    return inserted
+
+
+def generate_users(total, rng, start_date, end_date, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Bulk insert total synthetic (non-admin) users registered between start_date and end_date
+    """
+    first_id = (db.session.query(func.max(Usuario.id)).scalar() or 0) + 1
+    # Every synthetic user has the password "123456", hashed once for the whole run (a hash costs ~0.25s)
+    password_hash = hash_password("123456")
+
+    def make_batch(offset, size):
+        fechas = random_datetimes(rng, start_date, end_date, size)
+        rows = []
+        for i, fecha_de_registro in enumerate(fechas, start=first_id + offset):
+            rows.append(
+                {
+                    "nombre": f"Nombre{i}",
+                    "apellido": f"Apellido{i}",
+                    "username": f"usuario{i}",
+                    "email": f"usuario{i}@ejemplo.com",
+                    "fecha_de_registro": fecha_de_registro,
+                    "password": password_hash,
+                    "is_admin": False,
+                }
+            )
+        return rows
+
+    return insert_in_batches(Usuario.__table__, total, make_batch, batch_size, progress)
+
+
+def generate_products(total, rng, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Bulk insert total synthetic products, with the generic image
+    """
+    first_id = (db.session.query(func.max(Producto.id)).scalar() or 0) + 1
+    now = datetime.datetime.now()
+
+    def make_batch(offset, size):
+        categorias = rng.choice(SYNTHETIC_CATEGORIES, size=size).tolist()
+        precios = np.round(rng.lognormal(mean=4, sigma=1.2, size=size), 2).tolist()
+        stocks = rng.integers(0, 2000, size=size).tolist()
+        return [
+            {
+                "nombre": f"Producto sintético {i}",
+                "descripcion": f"Descripción {i}",
+                "categoria": categoria,
+                "precio": precio,
+                "stock": stock,
+                "image": GENERIC_PRODUCT_IMAGE,
+                "created_at": now,
+            }
+            for i, categoria, precio, stock in zip(
+                range(first_id + offset, first_id + offset + size), categorias, precios, stocks
+            )
+        ]
+
+    return insert_in_batches(Producto.__table__, total, make_batch, batch_size, progress)
+
+
+def generate_sales(
+    total, rng, start_date, end_date, batch_size=DEFAULT_BATCH_SIZE, decrement_stock=False, progress=None
+):
+    """
+    Bulk insert total sales of random users and products done between start_date and end_date.
+    With decrement_stock the units sold are taken out of stock, with one UPDATE per product for the whole run.
+    The daily rollups of the generated days are rebuilt at the end
+    """
+    products = db.session.query(Producto.id, Producto.precio).all()
+    product_ids = np.fromiter((producto_id for producto_id, _ in products), dtype=np.int64, count=len(products))
+    # Price of each product indexed by its id, the sales are done at the current price
+    prices = np.zeros(int(product_ids.max()) + 1 if product_ids.size else 0)
+    prices[product_ids] = [precio for _, precio in products]
+    user_ids = np.fromiter((usuario_id for (usuario_id,) in db.session.query(Usuario.id)), dtype=np.int64)
+    if total and (not product_ids.size or not user_ids.size):
+        raise ValueError("There must be products and users before generating sales")
+
+    units_sold = np.zeros(int(product_ids.max()) + 1 if product_ids.size else 0, dtype=np.int64)
+
+    # The sales are generated in chronological order, each batch inside its own slice of the date range: besides
+    # being realistic, the inserts append to the end of the fecha_de_venta index instead of splitting its pages
+    batch_span = (end_date - start_date) / max(-(-total // batch_size), 1)
+
+    def make_batch(offset, size):
+        batch_start = start_date + batch_span * (offset // batch_size)
+        producto_ids = rng.choice(product_ids, size=size)
+        cantidades = rng.integers(1, 11, size=size)
+        if decrement_stock:
+            units_sold[:] += np.bincount(producto_ids, weights=cantidades, minlength=units_sold.size).astype(np.int64)
+
+        precios = prices[producto_ids]
+        return [
+            {
+                "producto_id": producto_id,
+                "usuario_id": usuario_id,
+                "cantidad": cantidad,
+                "fecha_de_venta": fecha,
+                "precio_unitario": precio_unitario,
+                "importe": importe,
+            }
+            for producto_id, usuario_id, cantidad, fecha, precio_unitario, importe in zip(
+                producto_ids.tolist(),
+                rng.choice(user_ids, size=size).tolist(),
+                cantidades.tolist(),
+                random_datetimes(rng, batch_start, batch_start + batch_span, size, sort=True),
+                precios.tolist(),
+                (precios * cantidades).tolist(),
+            )
+        ]
+
+    inserted = insert_in_batches(Venta.__table__, total, make_batch, batch_size, progress)
+
+    # One GROUP BY over the generated date range, instead of an upsert per batch
+    if inserted:
+        rebuild_rollups(start_date.date(), end_date.date())
+        db.session.commit()
+
+    if decrement_stock and inserted:
+        table = Producto.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam("producto_id")).values(stock=table.c.stock - bindparam("sold")),
+            [
+                {"producto_id": producto_id, "sold": int(units_sold[producto_id])}
+                for producto_id in np.flatnonzero(units_sold).tolist()
+            ],
+        )
+        db.session.commit()
+
+    return inserted
@@ -0,0 +1,84 @@
+# Built-in imports
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Local imports
+
+# Longest side (in pixels) of each thumbnail variant generated for a product image
+THUMBNAIL_SIZES = (64, 256, 1024)
+THUMBNAIL_FOLDER = "thumbnails"
+
+# Pillow format name for the extensions of the variants
+PILLOW_FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "gif": "GIF", "bmp": "BMP", "webp": "WEBP"}
+
+
+def thumbnail_path(image_path, size, extension=None):
+    """
+    Path of the variant of image_path with the given size, saved next to it in the thumbnails folder.
+    The original extension is kept unless another one (e.g. "webp") is given
+    """
+    image_path = Path(image_path)
+    extension = extension or image_path.suffix.lstrip(".")
+    return image_path.parent / THUMBNAIL_FOLDER / f"{image_path.stem}-{size}.{extension.lower()}"
+
+
+def generate_thumbnails(image_path, force=False):
+    """
+    Generate every size of image_path, in WebP and in its original format.
+    Variants newer than the original are kept unless force is True. Returns the number of files written
+    """
+    image_path = Path(image_path)
+    extension = image_path.suffix.lstrip(".").lower()
+    if extension not in PILLOW_FORMATS or not image_path.is_file():
+        # E.g. SVG images stored before they were rejected (or missing files), they are served as they are
+        return 0
+
+    variants = [
+        (size, variant_extension)
+        for size in THUMBNAIL_SIZES
+        for variant_extension in dict.fromkeys((extension, "webp"))
+    ]
+    if not force:
+        original_mtime = os.path.getmtime(image_path)
+        variants = [
+            (size, variant_extension)
+            for size, variant_extension in variants
+            if not thumbnail_path(image_path, size, variant_extension).exists()
+            or os.path.getmtime(thumbnail_path(image_path, size, variant_extension)) < original_mtime
+        ]
+    if not variants:
+        return 0
+
+    # Pillow is imported only when there are images to process, not with the app
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(image_path) as original:
+            original.load()
+            (image_path.parent / THUMBNAIL_FOLDER).mkdir(exist_ok=True)
+            for size, variant_extension in variants:
+                variant = original.copy()
+                variant.thumbnail((size, size))
+                pillow_format = PILLOW_FORMATS[variant_extension]
+                if pillow_format == "JPEG" and variant.mode not in ("RGB", "L"):
+                    variant = variant.convert("RGB")
+                variant.save(thumbnail_path(image_path, size, variant_extension), pillow_format)
+    except (OSError, UnidentifiedImageError) as error:
+        logging.getLogger(__name__).warning(f"Error generating the thumbnails of {image_path}: {str(error)}")
+        return 0
+
+    return len(variants)
+
+
+def generate_thumbnails_in_pool(image_paths, workers=None, force=False):
+    """
+    Generate the thumbnails of many images in a process pool. Returns the number of files written
+    """
+    image_paths = list(dict.fromkeys(str(image_path) for image_path in image_paths))
+    if not image_paths:
+        return 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(generate_thumbnails, image_paths, [force] * len(image_paths)))
@@ -0,0 +1,99 @@
+# Built-in imports
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Thirty part imports
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# Local imports
+from src.models import IMAGE_FAILED, IMAGE_READY, Producto, db
+from src.utils.image_store import commit_spooled_image
+from src.utils.thumbnails import PILLOW_FORMATS, generate_thumbnails
+
+# Pool of the workers that process the uploaded images, created with the first upload
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config["IMAGE_UPLOAD_WORKERS"], thread_name_prefix="image-upload"
+            )
+        return _executor
+
+
+def verify_image(path, extension):
+    """
+    Decode the image header with Pillow, which raises an error when the file is truncated or corrupt
+    """
+    if extension not in PILLOW_FORMATS:
+        return
+
+    # Pillow is imported only when there are images to process, not with the app
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.verify()
+
+
+def process_image_upload(app, producto_id, spooled_image):
+    """
+    Background job of an uploaded image: verify it, move it to the image store, generate its thumbnails and update
+    the product (image path and image_status)
+    """
+    with app.app_context():
+        upload_folder = app.config["UPLOAD_FOLDER"]
+        try:
+            verify_image(spooled_image.path, spooled_image.extension)
+            image = commit_spooled_image(spooled_image, upload_folder)
+            generate_thumbnails(Path(upload_folder) / image)
+        except Exception as error:
+            spooled_image.discard()
+            app.logger.warning(f"Error processing the image of the product {producto_id}: {str(error)}")
+            values = {"image_status": IMAGE_FAILED}
+        else:
+            values = {"image": image.as_posix(), "image_status": IMAGE_READY}
+
+        # Through the ORM, so the caches of the product are invalidated like with any other change
+        producto = db.session.get(Producto, producto_id)
+        if producto is None:
+            # Deleted while its image was processed
+            return
+        for name, value in values.items():
+            setattr(producto, name, value)
+        db.session.commit()
+
+
+@event.listens_for(Session, "before_flush")
+def collect_pending_images(session, flush_context, instances):
+    for instance in session.new | session.dirty:
+        if isinstance(instance, Producto) and instance.pending_image is not None:
+            session.info.setdefault("pending_images", []).append((instance, instance.pending_image))
+            instance.pending_image = None
+
+
+@event.listens_for(Session, "after_commit")
+def submit_pending_images_after_commit(session):
+    # The jobs are only submitted once the product is committed, so the worker always finds it
+    pending_images = session.info.pop("pending_images", [])
+    if not pending_images:
+        return
+
+    app = current_app._get_current_object()
+    executor = get_executor(app)
+    for instance, spooled_image in pending_images:
+        # The identity is known without a query (the committed instance is expired)
+        producto_id = inspect(instance).identity[0]
+        executor.submit(process_image_upload, app, producto_id, spooled_image)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_images_after_rollback(session):
+    for instance, spooled_image in session.info.pop("pending_images", []):
+        spooled_image.discard()
@@ -6,26 +6,14 @@ from pathlib import Path
 # Third-party imports
 from flask import current_app
 from unidecode import unidecode
-from werkzeug.utils import secure_filename
 
 # Local imports
 from src.utils.sample_products_data import productos
 from src import db
-from src.models import Usuario, Producto, Venta
-
-
-def read_an_image(image_name: str):
-    upload_folder = Path(current_app.config["UPLOAD_FOLDER"])
-    image_path = upload_folder / "images" / secure_filename(image_name)
-
-    try:
-        with open(image_path, "rb") as f:
-            image_data = f.read()
-    except FileNotFoundError:
-        with open(upload_folder / "images" / "generic-product.png", "rb") as f:
-            image_data = f.read()
-
-    return image_data
+from src.models import Usuario, Producto
+from src.utils.image_store import GENERIC_PRODUCT_IMAGE
+from src.utils.passwords import hash_password
+from src.utils.thumbnails import generate_thumbnails_in_pool
 
 
 def create_admin():
@@ -67,6 +55,9 @@ def create_users():
     start_date = datetime.datetime.now() - datetime.timedelta(days=2 * 365)
     end_date = datetime.datetime.now() - datetime.timedelta(days=1)
 
+    # All the sample users share the password: it is hashed once instead of once per user
+    password_hash = hash_password("123456")
+
     for i in range(len(first_names)):
         first_name = first_names[i]
         last_name = last_names[i]
@@ -79,7 +70,7 @@ def create_users():
             email=email,
             fecha_de_registro=random_registration_date,
             username=username,
-            password="123456",
+            password_hash=password_hash,
         )
         db.session.add(usuario)
     db.session.commit()
@@ -98,37 +89,35 @@ def create_products():
                 categoria=value.get("categoria", "Sin categoría"),
                 precio=value.get("precio", 0.0),
                 stock=value.get("stock", 0),
-                image=value.get("image_name", read_an_image("generic-product.png")),
+                image=value.get("image_name", GENERIC_PRODUCT_IMAGE),
             )
             db.session.add(producto)
     db.session.commit()
 
+    # Generate the thumbnails of the sample images (the ones already generated are kept)
+    upload_folder = Path(current_app.config["UPLOAD_FOLDER"])
+    generate_thumbnails_in_pool(
+        upload_folder / value["image_name"]
+        for values in productos.values()
+        for value in values
+        if "image_name" in value
+    )
+
 
 def create_sales():
     """
     Create some sample sales.
     """
-    product_ids = [product.id for product in Producto.query.all()]
-    user_ids = [user.id for user in Usuario.query.all()]
-
-    sales_data = []
-
     start_date = datetime.datetime.now() - datetime.timedelta(days=2 * 365)
     end_date = datetime.datetime.now() - datetime.timedelta(days=1)
 
-    for _ in range(1000):
-        producto_id = random.choice(product_ids)
-        usuario_id = random.choice(user_ids)
-        cantidad = random.randint(1, 10)
-        fecha_de_venta = random_date(start_date, end_date)
-        sale = Venta(producto_id=producto_id, usuario_id=usuario_id, cantidad=cantidad, fecha_de_venta=fecha_de_venta)
-        sales_data.append(sale)
-        product = Producto.query.get(producto_id)
-        if product:
-            product.stock -= cantidad
-
-    db.session.add_all(sales_data)
-    db.session.commit()
+    # NumPy is only needed to seed the database, it is not imported with the app
+    import numpy as np
+
+    from src.utils.synthetic_data import generate_sales
+
+    # Bulk insert, and one stock UPDATE per product instead of one query per sale
+    generate_sales(1000, np.random.default_rng(), start_date, end_date, decrement_stock=True)
 
 
 def build_sample_db():
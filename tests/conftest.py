@@ -0,0 +1,72 @@
+# Built-in imports
+from datetime import datetime
+
+# Thirty part imports
+import pytest
+
+# Local imports
+from src import create_app
+from src.bootstrap import copy_template_database, upgrade_database
+from src.models import Producto, Usuario, db
+
+
+def dispose_engines(app):
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def template_database(tmp_path_factory):
+    """
+    Empty database built once per run by the migrations (not db.create_all()): a migration that drifts from the models
+    breaks the tests. Every test works on a copy of it
+    """
+    template = tmp_path_factory.mktemp("template") / "template.db"
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("DATABASE_URL", f"sqlite:///{template}")
+        app = create_app("testing")
+        with app.app_context():
+            upgrade_database()
+        # Closing the connections checkpoints the WAL into the file that is copied
+        dispose_engines(app)
+    return template
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, template_database):
+    """
+    App with the testing configuration on an empty SQLite file of its own (a file, not :memory:, so several threads
+    can share it)
+    """
+    database_path = copy_template_database(tmp_path / "test.db", template_database)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{database_path}")
+    app = create_app("testing")
+    app.config.update(UPLOAD_FOLDER=str(tmp_path / "static"), DASHBOARD_REPORTS_FOLDER=str(tmp_path / "reports"))
+
+    yield app
+    dispose_engines(app)
+
+
+@pytest.fixture
+def usuario_id(app):
+    with app.app_context():
+        usuario = Usuario("Ana", "García", "ana@example.com", datetime.now(), "ana", "secreto")
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario.id
+
+
+def add_productos(app, count, precio=10.0, stock=100):
+    """
+    Add count products and return their ids
+    """
+    with app.app_context():
+        productos = [
+            Producto(f"Producto {n}", "Descripción", "Pruebas", precio, stock, "images/generic-product.png")
+            for n in range(count)
+        ]
+        db.session.add_all(productos)
+        db.session.commit()
+        return [producto.id for producto in productos]
@@ -0,0 +1,66 @@
+# Built-in imports
+from contextlib import contextmanager
+
+# Thirty part imports
+import pytest
+from sqlalchemy import event
+
+# Local imports
+from src.models import Carrito, db
+from src.producto.cart import add_items, priced_cart
+from tests.conftest import add_productos
+
+
+@contextmanager
+def count_statements():
+    """
+    Count the SQL statements sent to the database inside the block: with count_statements() as statements: ...
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.mark.parametrize("cart_size", [1, 25])
+def test_cart_queries_do_not_grow_with_its_size(app, usuario_id, cart_size):
+    producto_ids = add_productos(app, cart_size)
+
+    with app.test_request_context():
+        carrito = Carrito(usuario_id)
+        db.session.add(carrito)
+        db.session.flush()
+
+        # The lines of the cart are loaded once, then one SELECT ... WHERE id IN (...) snapshots the name and price of
+        # every new product
+        with count_statements() as statements:
+            add_items(carrito, {producto_id: 2 for producto_id in producto_ids})
+        assert len(statements) == 2
+        assert len([statement for statement in statements if "FROM producto" in statement]) == 1
+
+        # Inserting the lines is a single executemany
+        with count_statements() as statements:
+            db.session.commit()
+        assert len([statement for statement in statements if "INSERT INTO carrito_item" in statement]) == 1
+
+        carrito_id = carrito.id
+        db.session.remove()
+
+        # A cart loaded again: its lines are one query, pricing it needs no more (prices are snapshotted)
+        carrito = db.session.get(Carrito, carrito_id)
+        with count_statements() as statements:
+            cart = priced_cart(carrito)
+        assert len(statements) == 1
+        assert len(cart) == cart_size
+        assert cart.total == pytest.approx(cart_size * 2 * 10.0)
+
+        # Adding products already in the cart only changes their quantities, without querying the products
+        with count_statements() as statements:
+            add_items(carrito, {producto_id: 3 for producto_id in producto_ids})
+        assert statements == []
@@ -0,0 +1,21 @@
+# Built-in imports
+
+# Thirty part imports
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+
+# Local imports
+from src.bootstrap import database_revision, head_revision
+from src.models import db
+
+
+def test_migrations_match_the_models(app):
+    """
+    The database of the tests is built by the migrations: it is at the head revision and has the schema of the
+    models (what flask db check verifies)
+    """
+    with app.app_context():
+        assert database_revision() == head_revision()
+        with db.engine.connect() as connection:
+            differences = compare_metadata(MigrationContext.configure(connection), db.metadata)
+        assert differences == []
@@ -0,0 +1,60 @@
+# Built-in imports
+import threading
+
+# Local imports
+from src.models import Producto, Venta, db
+from src.producto.cart import CartLine, PricedCart
+from src.producto.views import place_order
+from tests.conftest import add_productos
+
+THREADS = 8
+ORDERS_PER_THREAD = 10
+STOCK = 50
+UNITS_PER_ORDER = 3
+
+
+def test_concurrent_orders_never_oversell(app, usuario_id):
+    """
+    Many threads buying the same product at once: stock never goes negative and every committed sale is backed by
+    stock
+    """
+    (producto_id,) = add_productos(app, 1, stock=STOCK)
+    cart = PricedCart([CartLine(producto_id, "Producto 0", 10.0, UNITS_PER_ORDER, 10.0 * UNITS_PER_ORDER)])
+    start = threading.Barrier(THREADS)
+    results = []
+
+    def buy():
+        with app.app_context():
+            start.wait()
+            for _ in range(ORDERS_PER_THREAD):
+                results.append(not place_order(usuario_id, cart))
+            db.session.remove()
+
+    threads = [threading.Thread(target=buy) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        stock = db.session.get(Producto, producto_id).stock
+        ventas = Venta.query.filter_by(producto_id=producto_id).count()
+
+    placed = sum(results)
+    assert stock >= 0
+    assert placed == STOCK // UNITS_PER_ORDER
+    assert ventas == placed
+    assert stock == STOCK - placed * UNITS_PER_ORDER
+
+
+def test_order_with_a_line_out_of_stock_is_not_placed(app, usuario_id):
+    first_id, second_id = add_productos(app, 2, stock=5)
+    cart = PricedCart(
+        [CartLine(first_id, "Producto 0", 10.0, 2, 20.0), CartLine(second_id, "Producto 1", 10.0, 6, 60.0)]
+    )
+
+    with app.app_context():
+        failed_lines = place_order(usuario_id, cart)
+        assert [line.product_id for line in failed_lines] == [second_id]
+        assert [producto.stock for producto in Producto.query.order_by(Producto.id)] == [5, 5]
+        assert Venta.query.count() == 0
@@ -0,0 +1,71 @@
+# Built-in imports
+import sqlite3
+from contextlib import closing
+
+# Thirty part imports
+import pytest
+from flask import g
+from sqlalchemy import select
+
+# Local imports
+from src import create_app
+from src.bootstrap import copy_template_database
+from src.engine import REPLICA_BIND
+from src.models import Producto, db
+from tests.conftest import add_productos, dispose_engines
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch, template_database):
+    """
+    App (and the id of its product) with a primary and a read replica on two SQLite files. The replica is a copy of
+    the primary, then the product is renamed in the primary only: the name tells which database served a read
+    """
+    primary_path, replica_path = tmp_path / "primary.db", tmp_path / "replica.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{primary_path}")
+    monkeypatch.setenv("DATABASE_REPLICA_URL", f"sqlite:///{replica_path}")
+    copy_template_database(primary_path, template_database)
+    app = create_app("testing")
+
+    (producto_id,) = add_productos(app, 1)
+    with closing(sqlite3.connect(primary_path)) as primary, closing(sqlite3.connect(replica_path)) as replica:
+        primary.execute("UPDATE producto SET nombre = 'En la réplica' WHERE id = ?", (producto_id,))
+        primary.commit()
+        primary.backup(replica)
+        primary.execute("UPDATE producto SET nombre = 'En la primaria' WHERE id = ?", (producto_id,))
+        primary.commit()
+
+    yield app, producto_id
+    dispose_engines(app)
+
+
+def test_replica_reads_views_read_the_replica(replica_app):
+    app, producto_id = replica_app
+    client = app.test_client()
+
+    assert client.get(f"/get_producto/{producto_id}").get_json()["nombre"] == "En la réplica"
+    assert client.get(f"/api/v1/productos/{producto_id}").get_json()["data"]["nombre"] == "En la réplica"
+
+
+def test_other_views_read_the_primary(replica_app):
+    app, producto_id = replica_app
+    with app.test_request_context():
+        assert db.session.get(Producto, producto_id).nombre == "En la primaria"
+
+
+def test_reads_after_a_write_go_to_the_primary(replica_app):
+    app, producto_id = replica_app
+    statement = select(Producto.nombre).where(Producto.id == producto_id)
+    with app.test_request_context():
+        g.use_replica = True
+        assert db.session.get_bind(clause=statement) is db.engines[REPLICA_BIND]
+        assert db.session.scalar(statement) == "En la réplica"
+
+        db.session.add(Producto("Nuevo", "Descripción", "Pruebas", 1.0, 1, "images/generic-product.png"))
+        db.session.flush()
+
+        # stick_to_primary_after_flush: the request now reads its own writes
+        assert db.session.get_bind(clause=statement) is db.engine
+        assert db.session.scalar(statement) == "En la primaria"
+        assert db.session.scalar(select(Producto.id).where(Producto.nombre == "Nuevo")) is not None
+        db.session.rollback()
@@ -0,0 +1,41 @@
+# Built-in imports
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Local imports
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Budget of "import run" (the app factory, blueprints and extensions), measured with -X importtime. It was ~0.8s when
+# the heavy libraries were made lazy: a regression that brings them back (or a new heavy import) fails the test
+IMPORT_TIME_BUDGET = 1.5
+
+# Libraries that must only be imported when they are used (charts, synthetic data), never when the app starts.
+# Pillow is not here: Flask-Admin imports it (flask_admin.form.upload)
+LAZY_MODULES = ("matplotlib", "numpy", "pandas")
+
+
+def test_app_import_time_and_lazy_modules(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}")
+    check_lazy = f"import sys, run; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check_lazy],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Lines of -X importtime: "import time: <self us> | <cumulative us> | <indentation><module>"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, total, module = line.split("|")
+            if total.strip().isdigit():
+                cumulative[module.strip()] = int(total) / 1_000_000
+
+    assert result.stdout.strip() == "", f"Imported at startup: {result.stdout.strip()}"
+    assert cumulative["run"] < IMPORT_TIME_BUDGET, f"import run took {cumulative['run']:.2f}s"